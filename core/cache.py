@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+from core.config import FIELD_CACHE_BYTES, FIELD_CACHE_DIR, FIELD_CACHE_VERSION
+from core.meta import SingletonMeta
+
+
+class FieldCache(metaclass=SingletonMeta):
+    def __init__(self, max_bytes: int = FIELD_CACHE_BYTES, directory: str | None = FIELD_CACHE_DIR):
+        self.max_bytes = max_bytes  # Бюджет памяти; при превышении вытесняются давно не использованные поля
+        self.directory = directory  # Каталог .npy-файлов, None - без диска
+        self.entries: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()  # Кэш используется и из фоновой загрузки сцен
+
+    def _path(self, key: tuple) -> str:
+        # Версия в имени файла: поле, сохранённое прежним алгоритмом, не подменит новое
+        name = repr((FIELD_CACHE_VERSION, key))
+        return os.path.join(self.directory, hashlib.sha1(name.encode()).hexdigest() + ".npy")
+
+    def get(self, key: tuple) -> np.ndarray | None:
+        """Поле из памяти или с диска; None, если его нет"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        field = np.load(self._path(key))
+        self._remember(key, field)
+        return field
+
+    def put(self, key: tuple, field: np.ndarray):
+        """Сохраняет поле в память и, если задан каталог, на диск"""
+        self._remember(key, field)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path + f".{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as file:
+                np.save(file, field)
+            os.replace(tmp_path, path)  # Атомарно: параллельный get() не увидит недописанный файл
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Возвращает закэшированное поле или вычисляет и запоминает его.
+        Поля общие для всех сцен, поэтому отдаются только для чтения
+        """
+        field = self.get(key)
+        if field is None:
+            field = compute()
+            self.put(key, field)
+        return field
+
+    def _remember(self, key: tuple, field: np.ndarray):
+        field.flags.writeable = False
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+            self.entries[key] = field
+            self.nbytes += field.nbytes
+            while self.nbytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        """Очищает память; файлы на диске остаются"""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
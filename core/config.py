@@ -1,6 +1,17 @@
 from typing import Final
 
 
+STATIC: Final = "static"
 BACKGROUND: Final = "background"
 MIDDLE: Final = "middle"
 FOREGROUND: Final = "foreground"
+LAYERS: Final = {STATIC: -10, BACKGROUND: 0, MIDDLE: 10, FOREGROUND: 20}  # Слои по умолчанию и их z (больше - выше)
+STATIC_LAYERS: Final = {STATIC}  # Слои, которые растеризуются один раз в кэш и затем только копируются
+
+FIELD_CACHE_BYTES: Final = 256 * 2**20  # Бюджет памяти кэша сгенерированных полей
+FIELD_CACHE_DIR: Final = None  # Каталог для .npy-копий полей между запусками; None - только память
+FIELD_CACHE_VERSION: Final = 1  # Растёт при изменении генераторов полей, чтобы старые .npy-файлы не находились
+PREFETCH_BYTES: Final = 128 * 2**20  # Бюджет памяти сцен, подготовленных заранее
+SCENE_ENTRY_POINTS: Final = "compgeom.scenes"  # Группа entry points пакетов со сценами
+PROFILE_DIR: Final = "profiles"  # Куда сохраняются трассы кадров профилировщика
+SUSPEND_BYTES: Final = 256 * 2**20  # Бюджет памяти приостановленных сцен, к которым можно мгновенно вернуться
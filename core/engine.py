@@ -1,5 +1,12 @@
+import random
 import pygame
-from time import time
+from time import perf_counter
+
+from core.governor import QualityGovernor
+from core.profiler import FrameProfiler
+from core.replay import InputRecorder, InputReplay
+from renderers.hud import HUD, Overlay, StripChart
+from renderers.shape_render import RenderManager
 
 
 class Engine:
@@ -10,52 +17,223 @@ class Engine:
         pygame.init()
         self.screen = pygame.display.set_mode((width, height))
         pygame.display.set_caption(title)
+        self.hud = HUD()  # Текст поверх сцены
+        self.fps_overlay = self.hud.add("fps", Overlay('topright', (width - 10, 10), 20, glyphs=True))
+        self.fps_overlay.visible = False  # Переключается клавишей F3
+        self.stats_period = 0.5  # Как часто обновлять счётчик FPS, секунд
+        self.stats_time = 0.
+        self.profiler = FrameProfiler()  # Времена фаз последних кадров; F5 сохраняет их трассой
+        # График фаз кадра (F4): части столбика снизу вверх в порядке phases, белая точка - бюджет при 60 FPS
+        self.phases = ['events', 'update', 'render', 'hud', 'present']
+        colors = [(80, 160, 255), (80, 220, 120), (255, 170, 40), (200, 90, 220), (230, 60, 60)]
+        self.frame_graph = self.hud.add("frame_graph", StripChart(pygame.Rect(10, 10, 240, 80), colors, 1000 / 30,
+                                                                  marker=1000 / 60))
+        self.frame_legend = self.hud.add("frame_legend", Overlay('topleft', (10, 92), 18))
+        self.frame_legend.set(*((phase + ' ', color) for phase, color in zip(self.phases, colors)))
+        self.frame_graph.visible = self.frame_legend.visible = False
         self.scene_manager: SceneManager = SceneManager(self)
         self.clock = pygame.time.Clock()
         self.running = False
         self.fps = 60
+        self.governor = QualityGovernor(self.fps)  # Снижает качество сцены, не успевающей в кадр; F6 - выключить
+        self.quality_overlay = self.hud.add("quality", Overlay('bottomright', (width - 10, height - 10), 20))
         self.dt = 0  # delta time
+        # Симуляция идёт шагами постоянной длины независимо от частоты кадров; None - один update на кадр
+        self.fixed_step: float | None = 1 / 60
+        self.max_steps = 5  # Больше шагов за кадр не догоняется: отставание отбрасывается, а не копится
+        self.accumulator = 0.  # Время, ещё не отработанное шагами симуляции
+        self.alpha = 1.  # Доля шага, прошедшая после последнего update, для интерполяции при отрисовке
+        self.seed = random.getrandbits(32)  # Зерно генераторов случайных чисел сцен: своё в каждом запуске или --seed
+        self.recorder: InputRecorder | None = None
+        self.replay: InputReplay | None = None
+        self.canvas = pygame.Surface((width, height))  # Холст для перерисовки изменённых областей
         BaseModel.w = width
         BaseModel.h = height
 
-    def process_events(self):
-        """Обработка событий Pygame"""
-        for event in pygame.event.get():
+    def record(self, path: str):
+        """Записывать ввод в файл; зерно пишется в заголовок, чтобы повтор получил те же случайные числа"""
+        self.recorder = InputRecorder(path, self.seed, self.fixed_step, self.screen.get_size())
+        self.governor.enable(False)  # Иначе качество при записи и при повторе будет разным
+
+    def play(self, replay: InputReplay):
+        """Воспроизводить записанный ввод вместо настоящего; вызывается до init_scenes"""
+        self.replay = replay
+        self.seed = replay.seed
+        self.fixed_step = replay.fixed_step
+        self.fps = 0  # Без ограничения FPS: повтор служит замером производительности
+        self.governor.enable(False)  # Качество не должно зависеть от скорости машины, как и при записи
+
+    def process_events(self, events: list[pygame.event.Event] | None = None) -> list[pygame.event.Event]:
+        """Обработка событий Pygame; events - обработать их вместо очереди. Возвращает обработанные события"""
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.fps_overlay.visible = not self.fps_overlay.visible
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.frame_graph.visible = self.frame_legend.visible = not self.frame_graph.visible
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                print(f"Frame trace saved to {self.profiler.dump()}")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F6:
+                self.governor.enable(not self.governor.enabled)
+                self.update_quality()
             elif self.scene_manager.current_scene:
                 self.scene_manager.current_scene.handle_event(event)
+        return events
+
+    def replay_frame(self):
+        """Кадр из записи: её события и столько же шагов симуляции, сколько было при записи"""
+        # Настоящий ввод при повторе не учитывается, кроме закрытия окна
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            self.running = False
+        scene = self.scene_manager.current_scene
+        frame = self.replay.next_frame(scene.name if scene else None)
+        if frame is None:
+            # Сцена загружается дольше, чем при записи: кадр ждёт её без шагов симуляции
+            self.running = self.running and not self.replay.finished
+            self.profiler.mark('events')
+            return
+        self.process_events(self.replay.events(frame))
+        self.profiler.mark('events')
+        self.dt = self.fixed_step
+        for _ in range(frame['steps']):
+            self.update()
+        self.alpha = frame['alpha']
+
+    def simulate(self, frame_time: float) -> int:
+        """
+        Отрабатывает прошедшее время шагами fixed_step; без него - одним update с реальным dt.
+        Возвращает число выполненных шагов
+        """
+        if self.fixed_step is None:
+            self.dt = frame_time
+            self.update()
+            self.alpha = 1.
+            return 1
+
+        self.dt = self.fixed_step
+        self.accumulator += frame_time
+        steps = 0
+        while self.accumulator >= self.fixed_step and steps < self.max_steps:
+            self.update()
+            self.accumulator -= self.fixed_step
+            steps += 1
+        if steps == self.max_steps:
+            # Под нагрузкой кадры пропускаются, а симуляция не пытается догнать всё отставание
+            self.accumulator %= self.fixed_step
+        self.alpha = self.accumulator / self.fixed_step
+        return steps
 
     def update(self):
         """Обновление состояния игры/приложения"""
         if self.scene_manager.current_scene:
             self.scene_manager.current_scene.update(self.dt)
 
+        self.stats_time += self.dt
+        if self.fps_overlay.visible and self.stats_time >= self.stats_period:
+            self.stats_time = 0.
+            self.fps_overlay.set((f"FPS {self.clock.get_fps():5.1f}", (255, 255, 0)))
+
     def rendering(self):
         """Отрисовка кадра"""
-        self.screen.fill((0, 0, 0))  # Очистка экрана
-        if self.scene_manager.current_scene:
-            self.scene_manager.render_navigation_hint()  # Сообщение между сценами
-            self.scene_manager.current_scene.render(self.screen)  # Отрисовка сцены
-        pygame.display.flip()  # Обновление экрана
+        scene = self.scene_manager.current_scene
+        if not scene:
+            self.screen.fill((0, 0, 0))
+            self.scene_manager.render_loading()  # Прогресс подготовки следующей сцены
+            self.profiler.mark('render')
+            self.hud.render(self.screen)
+            self.profiler.mark('hud')
+            pygame.display.flip()
+            self.hud.frame_drawn()
+            self.profiler.mark('present')
+            return
+
+        scene.interpolate(self.alpha)
+
+        # Перерисовываются только области изменённых объектов; None - весь экран
+        rects = scene.renderer.dirty_regions(self.screen.get_rect())
+        if rects is not None:
+            rects += [rect.clip(self.screen.get_rect()) for rect in self.hud.dirty_regions()]
+        if rects is None:
+            self.screen.fill((0, 0, 0))  # Очистка экрана
+            scene.render(self.screen)  # Отрисовка сцены
+            self.profiler.mark('render')
+            self.hud.render(self.screen)  # Подсказки и счётчики поверх сцены
+            self.profiler.mark('hud')
+            pygame.display.flip()  # Обновление экрана
+        elif rects:
+            # Объекты рисуются на холсте без отсечения (отсечённые линии растеризуются иначе),
+            # на экран копируются только сами области
+            for rect in rects:
+                self.canvas.fill((0, 0, 0), rect)
+                scene.render(self.canvas, rect)
+                self.profiler.mark('render')
+                self.hud.render(self.canvas, rect)
+                self.profiler.mark('hud')
+                self.screen.blit(self.canvas, rect, rect)
+            pygame.display.update(rects)
+        scene.renderer.frame_drawn()
+        self.hud.frame_drawn()
+        self.profiler.mark('present')
+
+    def govern(self, work: float):
+        """Передаёт регулятору качества время работы кадра без ожидания"""
+        if self.governor.observe(self.scene_manager.current_scene, work):
+            self.update_quality()
+
+    def update_quality(self):
+        """Уровень качества в HUD; показывается только у сцен с настройками"""
+        self.quality_overlay.visible = bool(self.governor.knobs)
+        if self.governor.knobs:
+            color = (255, 255, 255) if self.governor.enabled else (120, 120, 120)
+            self.quality_overlay.set((self.governor.describe(), color))
+
+    def end_frame(self):
+        """Передаёт профилировщику статистику рендера за кадр и обновляет график"""
+        renderer = RenderManager()
+        scene = self.scene_manager.current_scene
+        self.profiler.end_frame(scene.name if scene else None, renderer.layer_times, len(renderer.handles),
+                                renderer.drawn_count)
+        renderer.layer_times.clear()
+        renderer.drawn_count = 0
+        if self.frame_graph.visible:
+            self.frame_graph.push(self.profiler.latest(self.phases))
 
     def run(self):
         """Основной игровой цикл"""
         self.running = True
-        last_time = time()
+        last_time = perf_counter()
 
         while self.running:
-            # Вычисление delta time
-            current_time = time()
-            self.dt = current_time - last_time
+            # Время, прошедшее с прошлого кадра
+            current_time = perf_counter()
+            frame_time = current_time - last_time
             last_time = current_time
 
             # Три основных этапа игрового цикла
-            self.process_events()
-            self.update()
+            self.profiler.begin_frame()
+            self.scene_manager.update_loading()  # Подмена сцены после фоновой загрузки, раз за кадр, а не за шаг
+            if self.replay:
+                self.replay_frame()
+            else:
+                scene = self.scene_manager.current_scene
+                events = self.process_events()
+                self.profiler.mark('events')
+                steps = self.simulate(frame_time)
+                if self.recorder:
+                    self.recorder.record(scene.name if scene else None, events, steps, self.alpha)
+            self.profiler.mark('update')
             self.rendering()
+            self.govern(perf_counter() - current_time)
 
             # Ограничение FPS
             self.clock.tick(self.fps)
+            self.profiler.mark('idle')
+            self.end_frame()
 
+        if self.recorder:
+            self.recorder.close()
+        self.scene_manager.loader.shutdown()
         pygame.quit()
@@ -0,0 +1,127 @@
+from typing import Any, Callable
+
+import numpy as np
+
+
+class Knob:
+    def __init__(self, name: str, values: list, apply: Callable[[Any], None]):
+        """
+        Настройка качества сцены
+        :param name: подпись в HUD
+        :param values: значения от лучшего к самому дешёвому
+        :param apply: применяет значение к сцене
+        """
+        self.name = name
+        self.values = values
+        self.apply = apply
+        self.index = 0
+
+    @property
+    def value(self):
+        return self.values[self.index]
+
+
+class QualityGovernor:
+    def __init__(self, fps: int = 60, window: int = 30, low: float = 0.6, high: float = 1.0):
+        """
+        Держит частоту кадров, понижая и повышая качество открытой сцены.
+        Уровни качества идут от 0 (все настройки лучшие) и на каждом следующем одна настройка становится дешевле:
+        сначала первая до конца своих значений, затем вторая и т.д.
+        :param fps: целевая частота кадров
+        :param window: по скольким кадрам усредняется время работы
+        :param low: доля бюджета кадра, ниже которой качество можно повысить
+        :param high: доля бюджета кадра, выше которой качество понижается
+        """
+        self.enabled = True
+        self.budget = 1 / fps
+        self.times = np.zeros(window)  # Время работы последних кадров без ожидания, секунды
+        self.count = 0  # Кадров в окне после последнего решения
+        self.low = low
+        self.high = high
+        # Повышение ждёт patience быстрых окон подряд; если после него сразу пришлось понизить, ожидание удваивается
+        self.patience = 1
+        self.max_patience = 32
+        self.fast_windows = 0
+        self.raised = False
+        self.scene = None
+        self.knobs: list[Knob] = []
+        self.levels: dict[str, int] = {}  # Уровень каждой сцены сохраняется при уходе с неё
+
+    @property
+    def level(self) -> int:
+        return self.levels.get(self.scene.name, 0) if self.scene else 0
+
+    @property
+    def max_level(self) -> int:
+        return sum(len(knob.values) - 1 for knob in self.knobs)
+
+    def attach(self, scene):
+        """Начинает следить за новой сценой и применяет её сохранённый уровень"""
+        self.scene = scene
+        self.knobs = scene.knobs() if scene else []
+        self.count = self.fast_windows = 0
+        self.raised = False
+        if self.knobs:
+            self.set_level(self.level, force=True)
+
+    def enable(self, enabled: bool):
+        """Включает или выключает регулятор; выключенный возвращает всем сценам лучшее качество"""
+        self.enabled = enabled
+        self.count = self.fast_windows = 0
+        if not enabled:
+            self.levels.clear()
+            if self.knobs:
+                self.set_level(0)
+
+    def set_level(self, level: int, force: bool = False):
+        """Применяет настройки уровня; force - применить все, а не только изменившиеся"""
+        self.levels[self.scene.name] = level
+        for knob in self.knobs:
+            index = min(level, len(knob.values) - 1)
+            level -= index
+            if force or index != knob.index:
+                knob.index = index
+                knob.apply(knob.value)
+
+    def observe(self, scene, seconds: float) -> bool:
+        """
+        Учитывает время работы кадра; вызывается раз в кадр
+        :returns: True, если сцена сменилась или изменился её уровень
+        """
+        changed = scene is not self.scene
+        if changed:
+            self.attach(scene)
+        if not self.enabled or not self.knobs:
+            return changed
+
+        self.times[self.count] = seconds
+        self.count += 1
+        if self.count < len(self.times):
+            return changed
+        self.count = 0  # После каждого решения окно набирается заново: новый уровень успевает сказаться
+        mean = self.times.mean()
+
+        if mean > self.high * self.budget:
+            self.fast_windows = 0
+            if self.raised:
+                self.patience = min(2 * self.patience, self.max_patience)
+            self.raised = False
+            if self.level < self.max_level:
+                self.set_level(self.level + 1)
+                return True
+        elif mean < self.low * self.budget and self.level > 0:
+            self.fast_windows += 1
+            if self.fast_windows >= self.patience:
+                self.fast_windows = 0
+                self.raised = True
+                self.set_level(self.level - 1)
+                return True
+        else:
+            self.fast_windows = 0
+            self.raised = False
+        return changed
+
+    def describe(self) -> str:
+        """Уровень и значения настроек для HUD"""
+        settings = ', '.join(f"{knob.name} {knob.value}" for knob in self.knobs)
+        return f"Quality {self.max_level - self.level}/{self.max_level}: {settings}"
@@ -0,0 +1,70 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class LoadingCancelled(Exception):
+    """Бросается внутри prepare() при отмене загрузки, чтобы прервать вычисления"""
+    pass
+
+
+class LoadTask:
+    def __init__(self, scene):
+        from core.scenes.base_scene import Scene
+
+        self.scene: Scene = scene
+        self.progress = 0.  # Доля выполненной работы от 0 до 1
+        self.cancelled = False
+        self.future: Future | None = None
+        self.initial = dict(vars(scene))  # Атрибуты сцены до prepare(), к ним возвращает release()
+
+    def report(self, progress: float):
+        """Колбэк прогресса для prepare(); вызывается из фонового потока"""
+        if self.cancelled:
+            raise LoadingCancelled(self.scene.name)
+        self.progress = min(max(progress, 0.), 1.)
+
+    def run(self):
+        self.scene.prepare(self.report)
+        self.progress = 1.
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self):
+        """Пробрасывает исключение из prepare() в основной поток"""
+        return self.future.result()
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+
+    def release(self):
+        """Отменяет подготовку и, когда она остановится, возвращает сцене прежние атрибуты, освобождая данные"""
+        self.cancel()
+        self.future.add_done_callback(lambda _: self.restore())
+
+    def restore(self):
+        state = vars(self.scene)
+        for key in set(state) - set(self.initial):
+            del state[key]
+        state.update(self.initial)
+
+
+class SceneLoader:
+    def __init__(self, workers: int = 1):
+        # Потоки, а не процессы: сцена готовит данные в своих атрибутах, а NumPy отпускает GIL
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scene-loader")
+        self.tasks: list[LoadTask] = []
+
+    def submit(self, scene) -> LoadTask:
+        """Запускает scene.prepare() в фоне"""
+        task = LoadTask(scene)
+        task.future = self.executor.submit(task.run)
+        self.tasks.append(task)
+        task.future.add_done_callback(lambda _: self.tasks.remove(task))
+        return task
+
+    def shutdown(self):
+        """Отменяет все незавершённые загрузки и дожидается остановки потоков"""
+        for task in list(self.tasks):
+            task.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,115 @@
+import json
+import os
+from time import perf_counter, strftime
+
+import numpy as np
+
+from core.config import PROFILE_DIR
+
+
+class FrameProfiler:
+    def __init__(self, capacity: int = 600, max_columns: int = 32):
+        """
+        Времена фаз кадра в кольцевом буфере: память выделяется один раз, старые кадры перезаписываются
+        :param capacity: сколько последних кадров хранится
+        :param max_columns: сколько разных фаз и слоёв можно учитывать
+        """
+        self.enabled = True
+        self.capacity = capacity
+        self.columns: dict[str, int] = {}  # Имя фазы ('update') или слоя ('layer:background') -> столбец
+        self.starts = np.zeros(capacity)  # Начало кадра, секунды perf_counter
+        self.times = np.zeros((capacity, max_columns))  # Длительности фаз, секунды
+        self.counts = np.zeros((capacity, 2), dtype=np.int64)  # Объектов в рендере и нарисовано за кадр
+        self.scenes: list[str | None] = [None] * capacity  # Какая сцена была открыта
+        self.frames = 0  # Всего записано кадров
+        self.last = 0.  # Время предыдущей отметки
+
+    @property
+    def row(self) -> int:
+        return self.frames % self.capacity
+
+    def column(self, name: str) -> int | None:
+        """Столбец фазы; новые фазы получают свободный столбец, пока они есть"""
+        index = self.columns.get(name)
+        if index is None and len(self.columns) < self.times.shape[1]:
+            index = self.columns[name] = len(self.columns)
+        return index
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.last = perf_counter()
+        self.starts[self.row] = self.last
+        self.times[self.row] = 0
+
+    def mark(self, phase: str):
+        """Приписывает фазе время с предыдущей отметки"""
+        if not self.enabled:
+            return
+        now = perf_counter()
+        index = self.column(phase)
+        if index is not None:
+            self.times[self.row, index] += now - self.last
+        self.last = now
+
+    def end_frame(self, scene: str | None, layer_times: dict[str, float], objects: int, drawn: int):
+        """Дописывает в кадр времена слоёв и счётчики рендера и переходит к следующему кадру"""
+        if not self.enabled:
+            return
+        for name, elapsed in layer_times.items():
+            index = self.column('layer:' + name)
+            if index is not None:
+                self.times[self.row, index] = elapsed
+        self.counts[self.row] = objects, drawn
+        self.scenes[self.row] = scene
+        self.frames += 1
+
+    def latest(self, phases: list[str]) -> list[float]:
+        """Длительности фаз последнего записанного кадра в миллисекундах"""
+        row = (self.frames - 1) % self.capacity
+        return [1000 * self.times[row, self.columns[phase]] if phase in self.columns else 0. for phase in phases]
+
+    def trace(self) -> dict:
+        """
+        Записанные кадры в формате Chrome trace (chrome://tracing, Perfetto):
+        фазы идут в потоке 0 внутри кадра, слои - в потоке 1 от начала фазы render
+        """
+        count = min(self.frames, self.capacity)
+        rows = [(self.frames - count + i) % self.capacity for i in range(count)]
+        origin = self.starts[rows[0]] if rows else 0.
+        phases = [(name, index) for name, index in self.columns.items() if not name.startswith('layer:')]
+        layers = [(name[len('layer:'):], index) for name, index in self.columns.items() if name.startswith('layer:')]
+
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in ((0, 'frame'), (1, 'layers'))]
+        for row in rows:
+            ts = 1e6 * (self.starts[row] - origin)
+            durations = 1e6 * self.times[row]
+            scene = self.scenes[row] or 'loading'
+            events.append({'name': scene, 'cat': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': ts, 'dur': float(sum(durations[index] for _, index in phases))})
+            start = ts
+            for name, index in phases:
+                if name == 'render':
+                    layer_start = start
+                    for layer, layer_index in layers:
+                        if durations[layer_index] > 0:
+                            events.append({'name': layer, 'cat': 'layer', 'ph': 'X', 'pid': 0, 'tid': 1,
+                                           'ts': layer_start, 'dur': float(durations[layer_index])})
+                            layer_start += durations[layer_index]
+                if durations[index] > 0:
+                    events.append({'name': name, 'cat': 'phase', 'ph': 'X', 'pid': 0, 'tid': 0,
+                                   'ts': start, 'dur': float(durations[index])})
+                    start += durations[index]
+            objects, drawn = self.counts[row]
+            events.append({'name': 'objects', 'ph': 'C', 'pid': 0, 'ts': ts,
+                           'args': {'registered': int(objects), 'drawn': int(drawn)}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, directory: str = PROFILE_DIR) -> str:
+        """Сохраняет trace() в JSON-файл и возвращает его путь"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"frames-{strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w') as file:
+            json.dump(self.trace(), file)
+        return path
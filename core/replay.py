@@ -0,0 +1,96 @@
+import json
+
+import pygame
+
+# Только ввод пользователя: события окна при воспроизведении приходят свои
+RECORDED_EVENTS = {pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                   pygame.MOUSEWHEEL}
+
+
+def encode(event: pygame.event.Event) -> dict:
+    """Событие в виде, пригодном для JSON; поля, которые нельзя сохранить (например окно), отбрасываются"""
+    fields = {}
+    for key, value in event.dict.items():
+        if isinstance(value, (bool, int, float, str)):
+            fields[key] = value
+        elif isinstance(value, tuple) and all(isinstance(item, (bool, int, float)) for item in value):
+            fields[key] = list(value)
+    return {'type': event.type, 'fields': fields}
+
+
+def decode(data: dict) -> pygame.event.Event:
+    fields = {key: tuple(value) if isinstance(value, list) else value for key, value in data['fields'].items()}
+    return pygame.event.Event(data['type'], fields)
+
+
+class InputRecorder:
+    def __init__(self, path: str, seed: int, fixed_step: float, size: tuple[int, int]):
+        """
+        Пишет ввод по кадрам в файл JSON Lines: первая строка - заголовок, далее по строке на кадр
+        :param seed: зерно генераторов случайных чисел сцен, без него повтор не совпадёт с записью
+        :param fixed_step: шаг симуляции; вместе с числом шагов каждого кадра делает повтор независимым от FPS
+        :param size: размер окна
+        """
+        if fixed_step is None:
+            raise ValueError("Запись ввода требует симуляции с постоянным шагом (fixed_step)")
+        self.file = open(path, 'w')
+        self.file.write(json.dumps({'seed': seed, 'fixed_step': fixed_step, 'size': list(size)}) + '\n')
+        self.frame = 0
+
+    def record(self, scene: str | None, events: list[pygame.event.Event], steps: int, alpha: float):
+        """
+        Дописывает кадр
+        :param scene: сцена, открытая в начале кадра (None - идёт загрузка)
+        :param events: события кадра, сохраняются только RECORDED_EVENTS
+        :param steps: сколько шагов симуляции выполнено в кадре
+        :param alpha: доля шага для интерполяции при отрисовке
+        """
+        events = [encode(event) for event in events if event.type in RECORDED_EVENTS]
+        self.file.write(json.dumps({'frame': self.frame, 'scene': scene, 'steps': steps, 'alpha': alpha,
+                                    'events': events}) + '\n')
+        self.frame += 1
+
+    def close(self):
+        self.file.close()
+
+
+class InputReplay:
+    def __init__(self, path: str):
+        """Запись InputRecorder, которая воспроизводится кадр за кадром"""
+        with open(path) as file:
+            header = json.loads(file.readline())
+            self.frames = [json.loads(line) for line in file if line.strip()]
+        if not header.get('fixed_step'):
+            # Без постоянного шага число шагов кадра ничего не говорит о прошедшем времени
+            raise ValueError(f"{path}: запись без fixed_step воспроизвести нельзя")
+        self.seed: int = header['seed']
+        self.fixed_step: float = header['fixed_step']
+        self.size: tuple[int, int] = tuple(header['size'])
+        self.frame = 0  # Следующий кадр записи
+
+    @property
+    def finished(self) -> bool:
+        return self.frame >= len(self.frames)
+
+    def next_frame(self, scene: str | None) -> dict | None:
+        """
+        Следующий кадр записи для открытой сцены или None, если его надо подождать.
+        Загрузка в фоне длится разное число кадров: кадры, где запись ещё ждала загрузку, а сцена уже открыта,
+        пропускаются, а пока сцена загружается дольше, чем при записи, кадры не расходуются
+        """
+        while not self.finished and self.frames[self.frame]['scene'] is None and scene is not None:
+            self.frame += 1
+        if self.finished:
+            return None
+        recorded = self.frames[self.frame]['scene']
+        if recorded is not None and recorded != scene:
+            if scene is not None:
+                raise RuntimeError(f"Повтор разошёлся с записью на кадре {self.frame}: "
+                                   f"открыта сцена {scene}, а записана {recorded}")
+            return None
+        self.frame += 1
+        return self.frames[self.frame - 1]
+
+    @staticmethod
+    def events(frame: dict) -> list[pygame.event.Event]:
+        return [decode(data) for data in frame['events']]
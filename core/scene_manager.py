@@ -1,18 +1,16 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from importlib import import_module
+from importlib.metadata import EntryPoint, entry_points
+from typing import Callable
+
 import pygame
 
-from core.scenes.fractal_scene import FractalScene
-from core.scenes.perlin_dyn_grid import PerlinDynamicGridScene
-from core.scenes.perlin_dyn_noise import PerlinDynNoiseScene
-from core.scenes.perlin_frac_noise import PerlinFracNoiseScene
-from core.scenes.perlin_grid import PerlinGridScene
-from core.scenes.perlin_noise import PerlinNoiseScene
-from core.scenes.perlin_vec_frac_noise import PerlinVecFracNoiseScene
-from core.scenes.radial_perlin import RadialPerlinScene
-from core.scenes.static_scene import StaticABScene
-from core.scenes.t_scene import MovingPointScene
-from core.scenes.test_scene import TestScene
-from core.scenes.transformation_scene import TransformationScene
+from core.config import PREFETCH_BYTES, SCENE_ENTRY_POINTS, SUSPEND_BYTES
+from core.loader import LoadTask, SceneLoader
 from core.scenes.base_scene import Scene
+from renderers.hud import Overlay, TextCache
+from renderers.shape_render import RenderManager
 
 
 class SceneManager:
@@ -20,34 +18,49 @@ class SceneManager:
         from core.engine import Engine
 
         self.engine: Engine = engine  # Ссылка на движок
-        self.scenes: dict[str, Scene] = {}  # Словарь всех сцен
+        self.scenes: dict[str, Scene] = {}  # Уже созданные сцены
+        # Все сцены в порядке добавления: готовая сцена, фабрика или путь 'модуль:Класс'
+        self.registry: dict[str, Scene | Callable[[], Scene] | str | EntryPoint] = {}
         self.current_scene: Scene | None = None  # Текущая активная сцена
         self.transitions: dict[str, dict] = {}  # Переходы с условиями {from_scene: {condition: to_scene}}
         self.default_transitions: dict[str, str] = {}  # Переходы по умолчанию {from_scene: to_scene}
         self.history: list[str] = []  # История сцен для возможности возврата
         self.max_history = 10  # Ограничение размера истории
+        self.loader = SceneLoader()  # Фоновая подготовка тяжёлых сцен
+        self.loading: LoadTask | None = None  # Сцена, которая сейчас готовится
+        # Сцены, которые готовятся заранее по переходу по умолчанию, старые первыми
+        self.prefetched: OrderedDict[str, LoadTask] = OrderedDict()
+        self.prefetch_enabled = True
+        self.prefetch_bytes = PREFETCH_BYTES  # Бюджет памяти заранее подготовленных сцен
+        self.prefetch_finished = False  # Выставляется из фонового потока, когда заготовка или импорт готовы
+        self.importing: dict[str, Future] = {}  # Модули сцен, импортируемые в фоне для заготовки
+        # Приостановленные сцены и их снятые с рендера объекты, давно покинутые первыми
+        self.suspended: OrderedDict[str, dict] = OrderedDict()
+        self.suspend_bytes = SUSPEND_BYTES  # Бюджет памяти приостановленных сцен
+        # Подсказка навигации пересобирается только при смене сцены или истории
+        self.hint = engine.hud.add("hint", Overlay('bottomleft', (10, engine.screen.get_height() - 10), 24))
 
     def init_scenes(self):
         """Инициализирует все начальные сцены"""
         def click_checker(context: dict):
             return context.get('click') == 't'
 
-        self.add_scene("main", StaticABScene())
-        self.add_scene("trajectories", MovingPointScene())
-        self.add_scene("transformation", TransformationScene())
-        self.add_scene("test", TestScene())
-        self.add_scene("fractal", FractalScene())
-        self.add_scene("perlin_static_grid", PerlinGridScene())
-        self.add_scene("perlin_noise_static", PerlinNoiseScene())
-        self.add_scene("perlin_frac_noise", PerlinFracNoiseScene())
-        self.add_scene("effective_perlin", PerlinVecFracNoiseScene())
-        self.add_scene("perlin_dyn", PerlinDynamicGridScene())
-        self.add_scene("perlin_dynamic_noise", PerlinDynNoiseScene())
-        self.add_scene("radial_perlin", RadialPerlinScene())
-
-        list_of_scenes = [val for val, _ in self.scenes.items()]
-
-        self.set_scene(list_of_scenes[0])
+        # Модули сцен импортируются при первом переходе на них, а не при запуске
+        self.add_scene("main", "core.scenes.static_scene:StaticABScene")
+        self.add_scene("trajectories", "core.scenes.t_scene:MovingPointScene")
+        self.add_scene("transformation", "core.scenes.transformation_scene:TransformationScene")
+        self.add_scene("test", "core.scenes.test_scene:TestScene")
+        self.add_scene("fractal", "core.scenes.fractal_scene:FractalScene")
+        self.add_scene("perlin_static_grid", "core.scenes.perlin_grid:PerlinGridScene")
+        self.add_scene("perlin_noise_static", "core.scenes.perlin_noise:PerlinNoiseScene")
+        self.add_scene("perlin_frac_noise", "core.scenes.perlin_frac_noise:PerlinFracNoiseScene")
+        self.add_scene("effective_perlin", "core.scenes.perlin_vec_frac_noise:PerlinVecFracNoiseScene")
+        self.add_scene("perlin_dyn", "core.scenes.perlin_dyn_grid:PerlinDynamicGridScene")
+        self.add_scene("perlin_dynamic_noise", "core.scenes.perlin_dyn_noise:PerlinDynNoiseScene")
+        self.add_scene("radial_perlin", "core.scenes.radial_perlin:RadialPerlinScene")
+        self.add_scene("terrain", "core.scenes.terrain_scene:TerrainScene")
+
+        list_of_scenes = [val for val, _ in self.registry.items()]
 
         self.add_transition(list_of_scenes[0], list_of_scenes[1])
         self.add_transition(list_of_scenes[0], list_of_scenes[3], click_checker)
@@ -62,19 +75,70 @@ class SceneManager:
         self.add_transition(list_of_scenes[8], list_of_scenes[9])
         self.add_transition(list_of_scenes[9], list_of_scenes[10])
         self.add_transition(list_of_scenes[10], list_of_scenes[11])
-        self.add_transition(list_of_scenes[11], list_of_scenes[0])
+        self.add_transition(list_of_scenes[11], list_of_scenes[12])
+        self.add_transition(list_of_scenes[12], list_of_scenes[0])
+
+        self.discover_scenes()
+
+        # Первая сцена открывается последней: переходы уже известны, и следующая начнёт готовиться сразу
+        self.set_scene(list_of_scenes[0])
+
+    def add_scene(self, name, scene: Scene | Callable[[], Scene] | str | EntryPoint):
+        """
+        Добавляет сцену в менеджер
+        :param name: имя сцены для переходов
+        :param scene: готовая сцена, фабрика без аргументов (например, класс), путь 'модуль:Класс' или entry point;
+            всё, кроме готовой сцены, импортируется и создаётся только при первом обращении
+        """
+        self.registry[name] = scene
+        self.scenes.pop(name, None)
+        if isinstance(scene, Scene):
+            self.bind_scene(name, scene)
+        return self  # Для цепочки вызовов
+
+    def discover_scenes(self, group: str = SCENE_ENTRY_POINTS):
+        """Регистрирует сцены установленных пакетов из entry points группы group, ничего не импортируя"""
+        for entry_point in entry_points(group=group):
+            if entry_point.name not in self.registry:
+                self.add_scene(entry_point.name, entry_point)
+        return self  # Для цепочки вызовов
 
-    def add_scene(self, name, scene: Scene):
-        """Добавляет сцену в менеджер"""
+    def bind_scene(self, name, scene: Scene):
         self.scenes[name] = scene
         scene.engine = self.engine  # Передаем ссылку на движок в сцену
         scene.name = name
-        return self  # Для цепочки вызовов
+
+    def get_scene(self, name) -> Scene:
+        """Сцена по имени; при первом обращении импортируется её модуль и создаётся объект"""
+        if name in self.scenes:
+            return self.scenes[name]
+        if name not in self.registry:
+            raise ValueError(f"Scene '{name}' not found")
+
+        scene = self.resolve(name)()
+        self.bind_scene(name, scene)
+        return scene
+
+    def resolve(self, name) -> Callable[[], Scene]:
+        """
+        Фабрика сцены: путь или точка входа импортируется и заменяется в registry самим классом.
+        Может выполняться в фоновом потоке - импорт защищён блокировкой модулей, запись в словарь атомарна
+        """
+        factory = self.registry[name]
+        if isinstance(factory, EntryPoint):
+            factory = factory.load()
+        elif isinstance(factory, str):
+            module, _, attribute = factory.partition(':') if ':' in factory else factory.rpartition('.')
+            factory = getattr(import_module(module), attribute)
+        self.registry[name] = factory
+        return factory
+
+    def resolved(self, name) -> bool:
+        return name in self.scenes or not isinstance(self.registry.get(name), (str, EntryPoint))
 
     def set_scene(self, name, save_history=True):
         """Устанавливает текущую сцену"""
-        if name not in self.scenes:
-            raise ValueError(f"Scene '{name}' not found")
+        scene = self.get_scene(name)
 
         # Сохраняем предыдущую сцену в историю
         if self.current_scene and save_history:
@@ -82,19 +146,135 @@ class SceneManager:
             if len(self.history) > self.max_history:
                 self.history.pop(0)
 
-        # Завершаем работу текущей сцены
+        # Завершаем работу текущей сцены или приостанавливаем её
         if self.current_scene:
-            self.current_scene.on_exit()
+            self.leave_scene(self.current_scene)
 
         # Очищаем экран при переключении сцен
         self.engine.screen.fill((0, 0, 0))
         pygame.display.flip()
+        RenderManager().invalidate_all()
+
+        # Отменяем незавершённую загрузку другой сцены
+        if self.loading:
+            self.loading.cancel()
+            self.loading = None
+
+        # Незаконченные заготовки других сцен заняли бы поток загрузки
+        for other, task in list(self.prefetched.items()):
+            if other != name and not task.done():
+                del self.prefetched[other]
+                task.release()
+
+        # Устанавливаем новую сцену; тяжёлые сцены сначала готовятся в фоне
+        if name in self.suspended:
+            # Объекты сцены не пересоздаются: их регистрации возвращаются в рендер как были
+            RenderManager().resume(self.suspended.pop(name))
+            self.current_scene = scene
+            self.current_scene.on_resume()
+        elif name in self.prefetched:
+            # Сцена уже подготовлена или готовится: загрузка подхватывается, а не начинается заново
+            self.current_scene = None
+            self.loading = self.prefetched.pop(name)
+            self.update_loading()
+        elif scene.needs_preparation:
+            self.current_scene = None
+            self.loading = self.loader.submit(scene)
+        else:
+            self.current_scene = scene
+            self.current_scene.on_enter()
+
+        self.update_navigation_hint()
+        self.prefetch_next()
+        return self  # Для цепочки вызовов
 
-        # Устанавливаем новую сцену
-        self.current_scene = self.scenes[name]
+    def leave_scene(self, scene: Scene):
+        """Сцена с suspendable паркуется для быстрого возврата, остальные завершаются"""
+        if not scene.suspendable:
+            scene.on_exit()
+            return
+        scene.on_suspend()
+        self.suspended[scene.name] = RenderManager().park()
+        self.trim_suspended()
+
+    def trim_suspended(self):
+        """Забывает давно покинутые сцены сверх max_history и бюджета памяти; при возврате они строятся заново"""
+        while self.suspended:
+            used = sum(self.scenes[name].footprint() + RenderManager.footprint(parked)
+                       for name, parked in self.suspended.items())
+            if len(self.suspended) <= self.max_history and used <= self.suspend_bytes:
+                return
+            name, _ = self.suspended.popitem(last=False)
+            # Объект сцены держит все подготовленные данные: без него их освободит сборщик мусора,
+            # а фабрика из registry создаст сцену заново. Готовый объект из add_scene пересоздать нечем
+            if self.registry[name] is not self.scenes[name]:
+                del self.scenes[name]
+
+    def update_loading(self):
+        """Подменяет сцену, как только её фоновая подготовка завершилась"""
+        if self.prefetch_finished:
+            self.prefetch_finished = False
+            self.trim_prefetched()
+            self.prefetch_next()  # Если закончился импорт модуля следующей сцены, пора её готовить
+
+        if not self.loading or not self.loading.done():
+            return
+
+        task, self.loading = self.loading, None
+        task.result()
+        self.current_scene = task.scene
         self.current_scene.on_enter()
+        self.update_navigation_hint()
+        self.prefetch_next()
 
-        return self  # Для цепочки вызовов
+    def prefetch_next(self):
+        """Готовит в фоне сцену перехода по умолчанию, пока открыта текущая; экран и рендер при этом не трогаются"""
+        if not self.prefetch_enabled or not self.current_scene:
+            return
+        name = self.default_transitions.get(self.current_scene.name)
+        if name is None or name == self.current_scene.name or name in self.prefetched or name in self.suspended:
+            return
+        if not self.resolved(name):
+            # Модуль сцены импортируется в фоне, а не в кадре; заготовка запустится, когда импорт закончится.
+            # Ошибка импорта всплывёт при переходе на сцену, когда get_scene импортирует модуль заново
+            if name not in self.importing:
+                self.importing[name] = self.loader.executor.submit(self.resolve, name)
+                self.importing[name].add_done_callback(lambda _: setattr(self, 'prefetch_finished', True))
+            return
+        self.importing.pop(name, None)
+        if not self.get_scene(name).needs_preparation:
+            return
+
+        task = self.loader.submit(self.get_scene(name))
+        self.prefetched[name] = task
+        task.future.add_done_callback(lambda _: setattr(self, 'prefetch_finished', True))
+
+    def trim_prefetched(self):
+        """Выбрасывает самые старые заготовки, пока их данные не уложатся в бюджет"""
+        while self.prefetched:
+            used = sum(task.scene.footprint() for task in self.prefetched.values() if task.done())
+            if used <= self.prefetch_bytes:
+                return
+            _, task = self.prefetched.popitem(last=False)
+            task.release()
+
+    def render_loading(self):
+        """Отображает прогресс фоновой подготовки сцены"""
+        if not self.loading:
+            return
+
+        screen = self.engine.screen
+        text = TextCache().render(f"Wait... {int(100 * self.loading.progress)}%", 42, (240, 20, 10))
+        text_rect = text.get_rect()
+        text_rect.midbottom = (screen.get_width() // 2, screen.get_height() // 2 - 10)
+        screen.blit(text, text_rect)
+
+        bar = pygame.Rect(0, 0, screen.get_width() // 2, 16)
+        bar.midtop = (screen.get_width() // 2, screen.get_height() // 2 + 10)
+        filled = bar.copy()
+        filled.width = int(bar.width * self.loading.progress)
+        pygame.draw.rect(screen, (240, 20, 10), filled)
+        pygame.draw.rect(screen, (255, 255, 255), bar, 1)
 
     def add_transition(self, from_scene, to_scene, condition=None):
         """Добавляет переход между сценами, опционально с условием"""
@@ -140,64 +320,21 @@ class SceneManager:
         self.set_scene(prev_scene, save_history=False)
         return True
 
-    def render_navigation_hint(self):
-        """Отображает подсказку о навигации между сценами с учетом настроек текущей сцены"""
-        if not self.current_scene:
-            return
-
-        # Проверяем, нужно ли показывать подсказки для этой сцены
-        if not self.current_scene.fast_forward_available and not self.current_scene.backward_available:
-            return
-
-        font = pygame.font.Font(None, 24)
-        current_x = 10
-        screen_bottom = self.engine.screen.get_height() - 10
+    def update_navigation_hint(self):
+        """Подсказка о навигации между сценами с учетом настроек текущей сцены"""
+        white, red = (255, 255, 255), (255, 0, 0)
+        scene = self.current_scene
+        parts = ()
 
         # Подсказка для перехода вперед
-        if self.current_scene.fast_forward_available:
-            text1 = font.render("Нажмите ", True, (255, 255, 255))
-            text2 = font.render("n", True, (255, 0, 0))
-            text3 = font.render(", чтобы перейти далее", True, (255, 255, 255))
-
-            text_rect1 = text1.get_rect()
-            text_rect1.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(text1, text_rect1)
-            current_x += text_rect1.width
-
-            text_rect2 = text2.get_rect()
-            text_rect2.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(text2, text_rect2)
-            current_x += text_rect2.width
-
-            text_rect3 = text3.get_rect()
-            text_rect3.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(text3, text_rect3)
-            current_x += text_rect3.width
+        if scene and scene.fast_forward_available:
+            parts += (("Нажмите ", white), ("n", red), (", чтобы перейти далее", white))
 
         # Подсказка для возврата назад
-        if self.current_scene.backward_available and self.history:
-            if self.current_scene.fast_forward_available:
-                # Добавляем разделитель, если есть обе подсказки
-                separator = font.render("   ||   ", True, (255, 255, 255))
-                sep_rect = separator.get_rect()
-                sep_rect.bottomleft = (current_x, screen_bottom)
-                self.engine.screen.blit(separator, sep_rect)
-                current_x += sep_rect.width
-
-            back1 = font.render("Нажмите ", True, (255, 255, 255))
-            back2 = font.render("b", True, (255, 0, 0))
-            back3 = font.render(", чтобы вернуться назад", True, (255, 255, 255))
-
-            back_rect1 = back1.get_rect()
-            back_rect1.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(back1, back_rect1)
-            current_x += back_rect1.width
-
-            back_rect2 = back2.get_rect()
-            back_rect2.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(back2, back_rect2)
-            current_x += back_rect2.width
-
-            back_rect3 = back3.get_rect()
-            back_rect3.bottomleft = (current_x, screen_bottom)
-            self.engine.screen.blit(back3, back_rect3)
+        if scene and scene.backward_available and self.history:
+            if scene.fast_forward_available:
+                parts += (("   ||   ", white), )  # Разделитель, если есть обе подсказки
+            parts += (("Нажмите ", white), ("b", red), (", чтобы вернуться назад", white))
+
+        self.hint.set(*parts)
+        self.hint.visible = bool(parts)
@@ -1,9 +1,20 @@
+import zlib
 from abc import ABC, abstractmethod
+from typing import Callable
 
+import numpy as np
+
+from core.governor import Knob
 from renderers.shape_render import RenderManager
 
+FOOTPRINT_DEPTH = 3  # Атрибут сцены -> объект -> его словарь или список -> массив
+
 
 class Scene(ABC):
+    # При уходе объекты сцены снимаются с рендера и сохраняются, а не удаляются: при возврате сцена
+    # восстанавливается как была, без prepare и on_enter. Стоит включать, только если подготовка дорогая
+    suspendable = False
+
     def __init__(self):
         from core.engine import Engine
 
@@ -13,6 +24,53 @@ class Scene(ABC):
         self.backward_available = True
         self.name: str | None = None
 
+    @property
+    def seed(self) -> int:
+        """
+        Зерно случайных чисел сцены, выводится из зерна движка и имени сцены: --seed и повтор ввода меняют все сцены,
+        но у каждой своя последовательность. Годится и в ключ FieldCache: то же зерно даёт то же поле
+        """
+        return int(np.random.SeedSequence([self.engine.seed, zlib.crc32(self.name.encode())]).generate_state(1)[0])
+
+    def prepare(self, progress: Callable[[float], None]):
+        """
+        Тяжёлые вычисления перед on_enter, выполняются в фоновом потоке.
+        Не должна трогать экран и RenderManager; о ходе работы сообщает через progress(доля от 0 до 1)
+        """
+        pass
+
+    def footprint(self) -> int:
+        """
+        Примерный объём подготовленных данных в байтах: массивы NumPy в атрибутах сцены, их списках и словарях
+        и внутри объектов, которые сцена держит (например базисы шума и их прореженные копии).
+        Движок и рендер не обходятся, каждый массив считается один раз
+        """
+        seen = set()
+
+        def walk(value, depth: int) -> int:
+            if id(value) in seen:
+                return 0
+            seen.add(id(value))
+            if isinstance(value, np.ndarray):
+                return value.nbytes
+            if depth == 0:
+                return 0
+            if isinstance(value, dict):
+                items = value.values()
+            elif isinstance(value, (list, tuple, set)):
+                items = value
+            else:
+                items = getattr(value, '__dict__', {}).values()
+            return sum(walk(item, depth - 1) for item in items)
+
+        return sum(walk(value, FOOTPRINT_DEPTH) for key, value in vars(self).items()
+                   if key not in ('engine', 'renderer'))
+
+    @property
+    def needs_preparation(self) -> bool:
+        """Сцена переопределяет prepare() и должна загружаться в фоне"""
+        return type(self).prepare is not Scene.prepare
+
     @abstractmethod
     def on_enter(self):
         """Вызывается при переключении на эту сцену"""
@@ -23,6 +81,14 @@ class Scene(ABC):
         """Вызывается при уходе с этой сцены"""
         pass
 
+    def on_suspend(self):
+        """Вызывается вместо on_exit у сцены с suspendable; её объекты рендера сохраняются"""
+        pass
+
+    def on_resume(self):
+        """Вызывается вместо prepare и on_enter при возврате на приостановленную сцену"""
+        pass
+
     @abstractmethod
     def handle_event(self, event):
         """Обработка событий pygame в этой сцене"""
@@ -33,8 +99,22 @@ class Scene(ABC):
         """Обновление состояния сцены"""
         pass
 
-    def render(self, surface):
-        """Отрисовка сцены на указанной поверхности"""
-        self.renderer.render_all(surface)
+    def knobs(self) -> list[Knob]:
+        """
+        Настройки качества, которыми QualityGovernor удерживает частоту кадров; первыми дешевеют первые.
+        Вызывается при каждом открытии сцены, уже после on_enter или on_resume
+        """
+        return []
+
+    def interpolate(self, alpha: float):
+        """
+        Вызывается перед каждой отрисовкой; alpha - доля шага симуляции, прошедшая после последнего update.
+        Сцена может показать объекты между двумя последними шагами, по умолчанию они рисуются как есть
+        """
+        pass
+
+    def render(self, surface, area=None):
+        """Отрисовка сцены на указанной поверхности; area - перерисовать только объекты, задевающие эту область"""
+        self.renderer.render_all(surface, area)
 
 
@@ -1,5 +1,6 @@
 import pygame
 
+from core.governor import Knob
 from core.scenes.base_scene import Scene
 from geometry.primitives import Fractal
 
@@ -11,13 +12,28 @@ class FractalScene(Scene):
         self.frac_2 = None
         self.frac_3 = None
         self.frac_4 = None
+        self.max_level = 4  # Уровень фракталов ограничивается сверху; звеньев ломаной на уровне n - 4^n
 
     def on_enter(self):
+        self.build()
+
+    def build(self):
         koh = ((0, 0), (1/3, 0), (1/2, (1/12)**(1/2)), (2/3, 0), (1, 0))
-        self.frac_1 = Fractal(((-350, 150), (-50, 150)), koh, 1)
-        self.frac_2 = Fractal(((50, 150), (350, 150)), koh, 2)
-        self.frac_3 = Fractal(((-350, -150), (-50, -150)), koh, 3)
-        self.frac_4 = Fractal(((50, -150), (350, -150)), koh, 4)
+        for fractal in (self.frac_1, self.frac_2, self.frac_3, self.frac_4):
+            if fractal is not None:
+                self.renderer.unregister(fractal)
+        self.frac_1 = Fractal(((-350, 150), (-50, 150)), koh, min(1, self.max_level))
+        self.frac_2 = Fractal(((50, 150), (350, 150)), koh, min(2, self.max_level))
+        self.frac_3 = Fractal(((-350, -150), (-50, -150)), koh, min(3, self.max_level))
+        self.frac_4 = Fractal(((50, -150), (350, -150)), koh, min(4, self.max_level))
+
+    def knobs(self):
+        return [Knob('fractal level', [4, 3, 2], self.set_max_level)]
+
+    def set_max_level(self, level: int):
+        if level != self.max_level:
+            self.max_level = level
+            self.build()
 
     def on_exit(self):
         self.renderer.clear_all()
@@ -0,0 +1,29 @@
+import numpy as np
+import pygame
+
+
+class OctaveTuning:
+    """
+    Настройка весов готовых октав на лету: стрелки вверх/вниз - persist, цифры - выбор октавы,
+    стрелки влево/вправо - её вес. Сцена задаёт octave_count и persist и вызывает reset_weights()
+    """
+    octave_count: int
+    persist: float
+
+    def reset_weights(self):
+        self.weights = self.persist ** np.arange(self.octave_count)
+        self.selected_octave = 0
+
+    def tune(self, key) -> bool:
+        """Меняет веса октав по клавише; возвращает True, если поле нужно пересобрать"""
+        if key in (pygame.K_UP, pygame.K_DOWN):
+            self.persist = min(max(self.persist + (0.05 if key == pygame.K_UP else -0.05), 0.05), 1.)
+            self.weights = self.persist ** np.arange(self.octave_count)
+        elif pygame.K_1 <= key < pygame.K_1 + self.octave_count:
+            self.selected_octave = key - pygame.K_1
+            return False
+        elif key in (pygame.K_LEFT, pygame.K_RIGHT):
+            self.weights[self.selected_octave] *= 1.25 if key == pygame.K_RIGHT else 0.8
+        else:
+            return False
+        return True
@@ -1,20 +1,37 @@
 import numpy as np
 import pygame
-from itertools import product
 
+from core.cache import FieldCache
 from core.config import FOREGROUND
+from core.governor import Knob
 from core.scenes.base_scene import Scene
-from geometry.primitives import Polyline, Point
+from geometry.noise import RotatingNoise, octave_gradients
+from geometry.primitives import Polyline, RasterLayer
+from geometry.simplex import SimplexNoise, simplex_fbm
 
 
 class PerlinDynNoiseScene(Scene):
+    suspendable = True
+
     def __init__(self):
         super().__init__()
         self.grid: list[Polyline] | None = None
         self.max_size: int | None = None
         self.vecs: None | list[np.ndarray] = None
-        self.thetas: list[np.ndarray] | None = None
-        self.delta_thetas: list[int | float] | None = None
+        self.noise: RotatingNoise | None = None
+        self.thetas: np.ndarray | None = None  # Текущий поворот градиентов каждой октавы
+        self.previous_thetas: np.ndarray | None = None  # Поворот на предыдущем шаге симуляции
+        self.delta_thetas: np.ndarray | None = None
+        self.raster: RasterLayer | None = None
+        self.stale = True  # Картинка отстала от thetas/time; поле строится раз за кадр, а не на каждом шаге
+
+        # 'rotation' - поворот градиентов решётки Перлина, 'simplex' - 3D симплекс-шум, где время - третья координата
+        self.backend = 'rotation'
+        self.simplex: SimplexNoise | None = None
+        self.time = 0.
+        self.previous_time = 0.  # Время на предыдущем шаге симуляции
+        self.time_speed = 0.6  # Клеток решётки первой октавы в секунду по оси времени
+        self.simplex_step = 2  # Симплекс-шум считается в каждом simplex_step-м пикселе и растягивается
 
         self.start_cells_count = 8
         self.octave_count = 4
@@ -23,29 +40,31 @@ class PerlinDynNoiseScene(Scene):
         self.offset = [0, 0]
         self.a_max = (1 - self.persist**self.octave_count) / (1 - self.persist)
 
-    def on_enter(self):
+        # Настройки качества для QualityGovernor
+        self.downscale = 1  # Шум считается в поле, уменьшенном в downscale раз, и растягивается smoothscale
+        self.active_octaves = self.octave_count  # Сколько первых октав суммируется
+
+    def prepare(self, progress):
         self.max_size = min(self.engine.screen.get_size()) - 80
+        self.simplex = SimplexNoise(self.seed)
+
+        self.vecs = octave_gradients(self.start_cells_count, self.octave_count, self.lacunar, self.seed)
+        key = ('rotation', self.seed, self.start_cells_count, self.octave_count, self.lacunar,
+               tuple(self.offset), self.max_size)
+        bases = FieldCache().get_or_compute(key, lambda: RotatingNoise(
+            self.max_size, self.max_size, self.start_cells_count, self.octave_count, self.persist, self.lacunar,
+            self.offset, vecs=self.vecs, progress=progress
+        ).bases)
+        self.noise = RotatingNoise(self.max_size, self.max_size, self.start_cells_count, self.octave_count,
+                                   self.persist, self.lacunar, self.offset, bases=bases)
+        self.thetas = np.zeros(self.octave_count)
+        self.previous_thetas = self.thetas.copy()
+        self.delta_thetas = (10 + 5 * np.arange(self.octave_count)) * np.pi / 180
 
-        font = pygame.font.Font(None, 42)
-        text = font.render("Wait...", True, (240, 20, 10))
-        text_rect = text.get_rect()
-        screen_left = (self.engine.screen.get_width() - text_rect.width) // 2
-        screen_bottom = (self.engine.screen.get_height() + text_rect.height) // 2
-        text_rect.bottomleft = (screen_left, screen_bottom)
-        self.engine.screen.blit(text, text_rect)
-        pygame.display.flip()
-
-        self.vecs = []
-        self.thetas = []
-        self.delta_thetas = []
-        for n in range(self.octave_count):
-            self.delta_thetas.append((10 + 5 * n) * np.pi / 180)
-            size = self.start_cells_count * (self.lacunar ** n)
-            grid_size = int(size) + 1
-            thetas = np.random.uniform(0, 2 * np.pi, (grid_size, grid_size))
-            self.thetas.append(thetas)
-            octave_vecs = np.stack([np.cos(thetas), np.sin(thetas)], axis=-1)
-            self.vecs.append(octave_vecs)
+    def on_enter(self):
+        self.raster = RasterLayer(np.zeros((self.max_size, self.max_size), dtype=np.uint8), layer=FOREGROUND,
+                                  size=(self.max_size, self.max_size))
+        self.stale = True
 
     def on_exit(self):
         self.renderer.clear_all()
@@ -56,43 +75,50 @@ class PerlinDynNoiseScene(Scene):
                 self.engine.scene_manager.next_scene()
             if event.key == pygame.K_b:
                 self.engine.scene_manager.previous_scene()
+            if event.key == pygame.K_s:
+                self.backend = 'simplex' if self.backend == 'rotation' else 'rotation'
+                self.stale = True
+
+    def knobs(self):
+        return [Knob('downscale', [1, 2, 4], self.set_downscale),
+                Knob('octaves', list(range(self.octave_count, 1, -1)), self.set_octaves)]
+
+    def set_downscale(self, downscale: int):
+        self.downscale = downscale
+        self.stale = True
+
+    def set_octaves(self, octaves: int):
+        self.active_octaves = octaves
+        self.stale = True
 
     def update(self, dt):
-        self.vecs = []
-        for n in range(self.octave_count):
-            size = self.start_cells_count * (self.lacunar ** n)
-            grid_size = int(size) + 1
-            dt = np.full((grid_size, grid_size), self.delta_thetas[n])
-            self.thetas[n] += dt
-            octave_vecs = np.stack([np.cos(self.thetas[n]), np.sin(self.thetas[n])], axis=-1)
-            self.vecs.append(octave_vecs)
-
-        x_grid, y_grid = np.meshgrid(np.arange(self.max_size), np.arange(self.max_size))
-        perlin_noise = np.zeros((self.max_size, self.max_size), dtype=np.float64)
-        for n in range(self.octave_count):
-            octave_max_w = self.start_cells_count * (self.lacunar ** n)
-            x_r = (self.lacunar ** n * self.start_cells_count * x_grid / self.max_size + self.offset[0]) % octave_max_w
-            y_r = (self.lacunar ** n * self.start_cells_count * y_grid / self.max_size + self.offset[1]) % octave_max_w
-            ind_x, ind_y = x_r.astype(int), y_r.astype(int)
-            dx, dy = x_r - ind_x, y_r - ind_y
-            u = 6 * dx ** 5 - 15 * dx ** 4 + 10 * dx ** 3
-            v = 6 * dy ** 5 - 15 * dy ** 4 + 10 * dy ** 3
-            perlin_octave = np.zeros_like(x_grid, dtype=np.float64)
-            for i, j in product(range(2), repeat=2):
-                ix, iy = ind_x + i, ind_y + j
-                dx_vec, dy_vec = dx - i, dy - j
-                gradients = self.vecs[n][ix, iy]
-                dot_products = gradients[:, :, 0] * dx_vec + gradients[:, :, 1] * dy_vec
-                weight_x = u if i == 1 else 1 - u
-                weight_y = v if j == 1 else 1 - v
-                perlin_octave += dot_products * weight_x * weight_y
-            perlin_noise += self.persist ** n * perlin_octave
-        perlin_noise /= self.a_max
-        normalized_noise = (perlin_noise + 1) / 2 * 255
+        # Шаг только продвигает время: при догоняющих шагах не строятся поля, которые никто не увидит.
+        # Прежние значения запоминаются у обоих вариантов, чтобы после переключения не смешивать давние шаги
+        self.previous_time = self.time
+        self.previous_thetas = self.thetas.copy()
+        if self.backend == 'simplex':
+            self.time += self.time_speed * dt
+        else:
+            self.thetas += self.delta_thetas
+        self.stale = True
 
-        self.renderer.clear_all()
-        for x, y in product(range(self.max_size), repeat=2):
-            gray_value = int(normalized_noise[y, x])
-            Point(coors=(x - self.max_size // 2, y - self.max_size // 2),
-                  color=(gray_value, gray_value, gray_value),
-                  layer=FOREGROUND)
+    def interpolate(self, alpha):
+        if not self.stale:
+            return
+        # Кадр показывает шум между двумя последними шагами: анимация плавная при любой частоте кадров
+        if self.backend == 'simplex':
+            time = self.previous_time + alpha * (self.time - self.previous_time)
+            self.stale = time != self.time
+            size = -(-self.max_size // (self.simplex_step * self.downscale))
+            perlin_noise = simplex_fbm(size, size, self.start_cells_count, self.active_octaves, self.persist,
+                                       self.lacunar, self.offset, noise=self.simplex, time=time)
+            # Растягивает до окна сам RasterLayer
+            self.raster.pixels = ((perlin_noise + 1) * 127.5).astype(np.uint8)
+            return
+
+        thetas = self.previous_thetas + alpha * (self.thetas - self.previous_thetas)
+        self.stale = not np.array_equal(thetas, self.thetas)
+        # Все градиенты октавы поворачиваются на один угол, поэтому кадр - это комбинация готовых базисов
+        perlin_noise = self.noise.field(thetas, self.active_octaves, self.downscale)
+        normalized_noise = (perlin_noise + 1) * 127.5
+        self.raster.pixels = normalized_noise.astype(np.uint8)
@@ -1,6 +1,7 @@
 import numpy as np
 import pygame
 
+from core.config import STATIC
 from core.scenes.base_scene import Scene
 from geometry.primitives import Polyline
 from geometry.shapes import Arrow
@@ -18,8 +19,10 @@ class PerlinGridScene(Scene):
     def on_enter(self):
         self.max_size = min(self.engine.screen.get_size()) - 80
 
+        rng = np.random.default_rng(self.seed)
+
         def random_unit_vector():
-            theta = np.random.uniform(0, 2 * np.pi)
+            theta = rng.uniform(0, 2 * np.pi)
             return np.cos(theta), np.sin(theta)
 
         list_of_vec = [[((-self.max_size // 2 + i * (self.max_size // self.start_cells_count),
@@ -37,12 +40,14 @@ class PerlinGridScene(Scene):
             for j in range(self.start_cells_count + 1)
         ]
 
-        self.grid = [Polyline(coors=((val, -self.max_size // 2), (val, self.max_size // 2)), color=(255, 255, 255))
+        self.grid = [Polyline(coors=((val, -self.max_size // 2), (val, self.max_size // 2)), color=(255, 255, 255),
+                              layer=STATIC)
                      for val in range(-self.max_size // 2,
                                       1 + self.max_size // 2,
                                       self.max_size // self.start_cells_count)
                      ]
-        self.grid += [Polyline(coors=((-self.max_size // 2, val), (self.max_size // 2, val)), color=(255, 255, 255))
+        self.grid += [Polyline(coors=((-self.max_size // 2, val), (self.max_size // 2, val)), color=(255, 255, 255),
+                               layer=STATIC)
                       for val in range(-self.max_size // 2,
                                       1 + self.max_size // 2,
                                       self.max_size // self.start_cells_count)
@@ -1,18 +1,28 @@
 import numpy as np
 import pygame
-from itertools import product
 
+from core.cache import FieldCache
 from core.config import FOREGROUND
 from core.scenes.base_scene import Scene
-from geometry.primitives import Polyline, Point
+from core.scenes.octave_tuning import OctaveTuning
+from geometry.noise import lattice_coords, octave_gradients, octave_stack
+from geometry.palette import Palette
+from geometry.primitives import Polyline, RasterLayer
 
 
-class RadialPerlinScene(Scene):
+class RadialPerlinScene(OctaveTuning, Scene):
+    suspendable = True
+
     def __init__(self):
         super().__init__()
         self.grid: list[Polyline] | None = None
         self.max_size: int | None = None
-        self.vecs: None | np.ndarray = None
+        self.vecs: None | list[np.ndarray] = None
+        self.image: np.ndarray | None = None
+        self.raster: RasterLayer | None = None
+        self.octaves: np.ndarray | None = None  # Невзвешенные октавы (octave_count, H, W) из кэша
+        self.masks: np.ndarray | None = None  # Маска острова каждой октавы при island_peek = 1
+        self.field: np.ndarray | None = None  # Нормализованная сумма октав, чтобы смена палитры её не пересчитывала
 
         self.start_cells_count = 8
         self.octave_count = 4
@@ -34,76 +44,69 @@ class RadialPerlinScene(Scene):
             0.95: (100, 70, 10),
             1: (255, 255, 255)
         }
-        self.thresholds = np.array(sorted(self.coloring.keys()))
-        self.colors = np.array([self.coloring[k] for k in self.thresholds])
+        self.palettes = [Palette(self.coloring), Palette(self.coloring, smooth=True)]
+        self.palette = self.palettes[0]
 
-    def on_enter(self):
+        # Кроме настройки октав: [ и ] - высота острова, m - маска острова на выбранной октаве, p - следующая палитра
+        self.reset_weights()
+
+    def prepare(self, progress):
         self.max_size = min(self.engine.screen.get_size()) - 80
 
         def island_mask(x_c, y_c, n):
-            return self.island_peek * np.exp(-((x_c - self.island_center[0] * self.lacunar ** n)**2 +
-                                               (y_c - self.island_center[1] * self.lacunar ** n)**2)/
-                                             (2*self.island_rad**2))
-
-        def get_color(x):
-            idx = np.searchsorted(self.thresholds, x, side='left')
-            return self.colors[idx]
-
-        font = pygame.font.Font(None, 42)
-        text = font.render("Wait...", True, (240, 20, 10))
-        text_rect = text.get_rect()
-        screen_left = (self.engine.screen.get_width() - text_rect.width) // 2
-        screen_bottom = (self.engine.screen.get_height() + text_rect.height) // 2
-        text_rect.bottomleft = (screen_left, screen_bottom)
-        self.engine.screen.blit(text, text_rect)
-        pygame.display.flip()
-
-        self.vecs = []
-        for n in range(self.octave_count):
-            size = self.start_cells_count * (self.lacunar ** n)
-            grid_size = int(size) + 1
-            thetas = np.random.uniform(0, 2 * np.pi, (grid_size, grid_size))
-            octave_vecs = np.stack([np.cos(thetas), np.sin(thetas)], axis=-1)
-            self.vecs.append(octave_vecs)
-        x_grid, y_grid = np.meshgrid(np.arange(self.max_size), np.arange(self.max_size))
-        perlin_noise = np.zeros((self.max_size, self.max_size), dtype=np.float64)
-
+            return np.exp(-((x_c[np.newaxis, :] - self.island_center[0] * self.lacunar ** n)**2 +
+                            (y_c[:, np.newaxis] - self.island_center[1] * self.lacunar ** n)**2)/
+                          (2*self.island_rad**2))
+
+        self.vecs = octave_gradients(self.start_cells_count, self.octave_count, self.lacunar, self.seed)
+        key = ('octaves', self.seed, self.start_cells_count, self.octave_count, self.lacunar,
+               tuple(self.offset), self.max_size)
+        self.octaves = FieldCache().get_or_compute(key, lambda: octave_stack(
+            self.max_size, self.max_size, self.start_cells_count, self.octave_count, self.lacunar, self.offset,
+            vecs=self.vecs, progress=progress
+        ))
+
+        # Маски всех октав, чтобы включение острова на любой из них не требовало пересчёта
+        self.masks = np.empty_like(self.octaves)
         for n in range(self.octave_count):
             octave_max_w = self.start_cells_count * (self.lacunar ** n)
-            x_r = (self.lacunar ** n * self.start_cells_count * x_grid / self.max_size + self.offset[0]) % octave_max_w
-            y_r = (self.lacunar ** n * self.start_cells_count * y_grid / self.max_size + self.offset[1]) % octave_max_w
-            ind_x, ind_y = x_r.astype(int), y_r.astype(int)
-            dx, dy = x_r - ind_x, y_r - ind_y
-            u = 6 * dx ** 5 - 15 * dx ** 4 + 10 * dx ** 3
-            v = 6 * dy ** 5 - 15 * dy ** 4 + 10 * dy ** 3
-            perlin_octave = np.zeros_like(x_grid, dtype=np.float64)
-            for i, j in product(range(2), repeat=2):
-                ix, iy = ind_x + i, ind_y + j
-                dx_vec, dy_vec = dx - i, dy - j
-                gradients = self.vecs[n][ix, iy]
-                dot_products = gradients[:, :, 0] * dx_vec + gradients[:, :, 1] * dy_vec
-                weight_x = u if i == 1 else 1 - u
-                weight_y = v if j == 1 else 1 - v
-                perlin_octave += dot_products * weight_x * weight_y
-
-            if n in self.island_octaves:
-                mask = island_mask(x_r, y_r, n)
-                perlin_octave += mask
-
-            perlin_noise += self.persist ** n * perlin_octave
+            x_r = lattice_coords(0, self.max_size, octave_max_w, self.max_size, self.offset[0])
+            y_r = lattice_coords(0, self.max_size, octave_max_w, self.max_size, self.offset[1])
+            self.masks[n] = island_mask(x_r, y_r, n)
+
+        self.field = self.compose()
+        self.image = self.palette.apply(self.field)
+
+    def compose(self) -> np.ndarray:
+        """Взвешенная сумма готовых октав и масок острова, нормализованная в [-1, 1]"""
+        island_weights = self.weights * [n in self.island_octaves for n in range(self.octave_count)]
+        perlin_noise = (np.tensordot(self.weights, self.octaves, axes=1) +
+                        self.island_peek * np.tensordot(island_weights, self.masks, axes=1))
 
         # Нормализация
         perlin_noise = (perlin_noise - np.min(perlin_noise)) / (np.max(perlin_noise) - np.min(perlin_noise))
         perlin_noise *= 2
         perlin_noise -= 1
+        return perlin_noise
+
+    def tune(self, key) -> bool:
+        """Кроме весов октав меняет остров и палитру; возвращает True, если поле нужно пересобрать"""
+        if key == pygame.K_p:
+            # Палитра перекрашивает готовое поле, пересобирать его не нужно
+            self.palette = self.palettes[(self.palettes.index(self.palette) + 1) % len(self.palettes)]
+            self.image = self.palette.apply(self.field)
+            self.raster.pixels = self.image
+            return False
+        if key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+            self.island_peek = max(self.island_peek + (0.5 if key == pygame.K_RIGHTBRACKET else -0.5), 0)
+        elif key == pygame.K_m:
+            self.island_octaves ^= {self.selected_octave}
+        else:
+            return super().tune(key)
+        return True
 
-        # Визуализация
-        for x, y in product(range(self.max_size), repeat=2):
-            color = get_color(perlin_noise[y, x])
-            Point(coors=(x - self.max_size // 2, y - self.max_size // 2),
-                  color=color,
-                  layer=FOREGROUND)
-
+    def on_enter(self):
+        self.raster = RasterLayer(self.image, layer=FOREGROUND)
 
     def on_exit(self):
         self.renderer.clear_all()
@@ -114,6 +117,10 @@ class RadialPerlinScene(Scene):
                 self.engine.scene_manager.next_scene()
             if event.key == pygame.K_b:
                 self.engine.scene_manager.previous_scene()
+            if self.tune(event.key):
+                self.field = self.compose()
+                self.image = self.palette.apply(self.field)
+                self.raster.pixels = self.image
 
     def update(self, dt):
         pass
@@ -0,0 +1,127 @@
+import numpy as np
+import pygame
+
+from core.config import FOREGROUND
+from core.scenes.radial_perlin import RadialPerlinScene
+from geometry.noise import fbm
+from geometry.primitives import RasterLayer
+
+
+class TerrainScene(RadialPerlinScene):
+    """Бесконечная карта в палитре RadialPerlinScene: поле считается кусками по мере прокрутки"""
+    arrows = (pygame.K_RIGHT, pygame.K_LEFT, pygame.K_DOWN, pygame.K_UP)
+
+    def __init__(self):
+        super().__init__()
+        self.chunk_size = 64
+        self.chunks: dict[tuple[int, int], np.ndarray] = {}  # (cx, cy) -> раскрашенный кусок (size, size, 3)
+        self.max_chunks = 400  # Сверх этого выбрасываются самые далёкие от камеры куски
+        self.prefetch_per_frame = 2  # Сколько кусков кольца вокруг экрана досчитывать за кадр
+        self.gain = 2.  # Растяжение неограниченного поля на диапазон палитры
+        self.camera = np.zeros(2)  # Левый верхний пиксель окна в мире, ось y вниз
+        self.previous_camera = np.zeros(2)  # Камера на предыдущем шаге симуляции
+        self.shown = np.zeros(2)  # Положение камеры, по которому собрана картинка
+        self.speed = 300.  # Скорость прокрутки стрелками, пикселей в секунду
+        self.moved = True
+        self.held: set[int] = set()  # Зажатые стрелки
+
+    def prepare(self, progress):
+        self.max_size = min(self.engine.screen.get_size()) - 80
+        self.camera = np.array([-self.max_size / 2, -self.max_size / 2])
+        self.previous_camera = self.camera.copy()
+        self.shown = self.camera.copy()
+
+        visible = self.visible_chunks()
+        for i, chunk in enumerate(visible):
+            self.chunk(*chunk)
+            progress((i + 1) / len(visible))
+        self.image = self.view()
+
+    def on_enter(self):
+        self.raster = RasterLayer(self.image, layer=FOREGROUND)
+        self.moved = False
+        self.held.clear()
+
+    def on_resume(self):
+        self.held.clear()  # Стрелки могли отпустить на другой сцене
+
+    def handle_event(self, event: pygame.event.Event):
+        # Стрелки здесь двигают камеру, настройка октав RadialPerlinScene к кускам не применяется
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_n:
+                self.engine.scene_manager.next_scene()
+            if event.key == pygame.K_b:
+                self.engine.scene_manager.previous_scene()
+        # Зажатые стрелки отслеживаются по событиям, а не через get_pressed(), чтобы их можно было воспроизвести
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key in self.arrows:
+            if event.type == pygame.KEYDOWN:
+                self.held.add(event.key)
+            else:
+                self.held.discard(event.key)
+        if event.type == pygame.MOUSEMOTION and event.buttons[0]:
+            # Перетаскивание не интерполируется: камера сразу оказывается под курсором
+            self.camera -= event.rel
+            self.previous_camera -= event.rel
+            self.moved = True
+
+    def update(self, dt):
+        right, left, down, up = (key in self.held for key in self.arrows)
+        step = np.array([right - left, down - up])
+        self.previous_camera = self.camera.copy()
+        if step.any():
+            self.camera += self.speed * dt * step
+            self.moved = True
+
+    def interpolate(self, alpha):
+        # Куски, в которые камера вот-вот въедет, считаются заранее и понемногу - раз за кадр, а не за шаг
+        missing = [chunk for chunk in self.visible_chunks(margin=1) if chunk not in self.chunks]
+        for chunk in missing[:self.prefetch_per_frame]:
+            self.chunk(*chunk)
+        self.evict()
+
+        if not self.moved:
+            return
+        # Картинка показывает камеру между двумя последними шагами: прокрутка плавная при любой частоте кадров
+        shown = self.previous_camera + alpha * (self.camera - self.previous_camera)
+        if not np.array_equal(np.floor(shown), np.floor(self.shown)):
+            self.raster.pixels = self.view(shown)
+        self.shown = shown
+        self.moved = not np.array_equal(shown, self.camera)
+
+    def visible_chunks(self, margin: int = 0, camera: np.ndarray | None = None) -> list[tuple[int, int]]:
+        """Куски, пересекающие окно камеры (по умолчанию текущей), плюс margin колец вокруг"""
+        camera = self.camera if camera is None else camera
+        x0, y0 = (np.floor(camera / self.chunk_size)).astype(int) - margin
+        x1, y1 = (np.floor((camera + self.max_size - 1) / self.chunk_size)).astype(int) + margin
+        return [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def chunk(self, cx: int, cy: int) -> np.ndarray:
+        """Кусок карты; считается только при первом обращении"""
+        if (cx, cy) not in self.chunks:
+            noise = fbm(self.chunk_size, self.chunk_size, self.start_cells_count, self.octave_count, self.persist,
+                        self.lacunar, self.offset, seed=self.seed, scale=self.max_size,
+                        origin=(cx * self.chunk_size, cy * self.chunk_size), wrap=False)
+            self.chunks[(cx, cy)] = self.palette.apply(self.gain * noise)
+        return self.chunks[(cx, cy)]
+
+    def view(self, camera: np.ndarray | None = None) -> np.ndarray:
+        """Собирает окно камеры (по умолчанию текущей) из кусков"""
+        camera = self.camera if camera is None else camera
+        left, top = np.floor(camera).astype(int)
+        image = np.empty((self.max_size, self.max_size, 3), dtype=np.uint8)
+        for cx, cy in self.visible_chunks(camera=camera):
+            x0, y0 = cx * self.chunk_size - left, cy * self.chunk_size - top
+            # Пересечение куска с окном в координатах окна
+            sx, sy = max(x0, 0), max(y0, 0)
+            ex, ey = min(x0 + self.chunk_size, self.max_size), min(y0 + self.chunk_size, self.max_size)
+            image[sy:ey, sx:ex] = self.chunk(cx, cy)[sy - y0:ey - y0, sx - x0:ex - x0]
+        return image
+
+    def evict(self):
+        """Выбрасывает самые далёкие от центра камеры куски, пока их больше max_chunks"""
+        if len(self.chunks) <= self.max_chunks:
+            return
+        center = (self.camera + self.max_size / 2) / self.chunk_size
+        far = sorted(self.chunks, key=lambda c: (c[0] + 0.5 - center[0])**2 + (c[1] + 0.5 - center[1])**2)
+        for chunk in far[self.max_chunks:]:
+            del self.chunks[chunk]
@@ -1,5 +1,6 @@
 import pygame
 
+from core.config import STATIC
 from core.scenes.base_scene import Scene
 from geometry.primitives import Polyline, Point
 from geometry.shapes import LetterVWithBase
@@ -17,8 +18,11 @@ class TestScene(Scene):
         self.active_angle: int | float | None = None
 
     def on_enter(self):
-        self.grid = [Polyline(coors=((val, -320), (val, 320)), color=(255, 255, 255)) for val in range(-400, 401, 50)]
-        self.grid += [Polyline(coors=((-400, val), (400, val)), color=(255, 255, 255)) for val in range(-300, 320, 50)]
+        # Сетка не меняется: слой STATIC растеризуется один раз и дальше только копируется
+        self.grid = [Polyline(coors=((val, -320), (val, 320)), color=(255, 255, 255), layer=STATIC)
+                     for val in range(-400, 401, 50)]
+        self.grid += [Polyline(coors=((-400, val), (400, val)), color=(255, 255, 255), layer=STATIC)
+                      for val in range(-300, 320, 50)]
         self.v_letter = LetterVWithBase(h=50, center=(25, 50), color=(0, 0, 255))
         print(self.v_letter.base_point.coors)
         self.v_letter.rotate_by_dot(60, (0, 0))
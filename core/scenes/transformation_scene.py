@@ -1,8 +1,9 @@
 import numpy as np
 import pygame
 
+from core.governor import Knob
 from core.scenes.base_scene import Scene
-from geometry.primitives import Arc
+from geometry.primitives import Arc, ShearedArc
 from geometry.shapes import LetterA, LetterB, AChain, LetterAWithBase, SpawnerABVChain
 
 
@@ -19,15 +20,36 @@ class TransformationScene(Scene):
         self.steps = [-0.02] * 25 + [0.02] * 50 + [-0.02] * 25
         self.c_s = 0
         self.figures: SpawnerABVChain | None = None
+        self.rng: np.random.Generator | None = None
+        self.arc_segment = 2  # Длина звена дуг в буквах, пикселей; больше - меньше вершин преобразуется в кадр
 
     def on_enter(self):
+        # Свой генератор с зерном движка: при повторе записанного ввода сцена ведёт себя так же
+        self.rng = np.random.default_rng(self.seed)
         self.letterB = LetterB(center=(-200, 125))
         self.letterA = LetterA(h=200)
         self.letterA2 = LetterAWithBase(h=200, color=(100, 255, 0))
         self.arc = Arc((0, 0), 100, 30, 150, (255, 0, 0))
         self.chain = AChain(count_a=20, color=(255, 123, 12))
         self.c_s = 0
-        self.figures = SpawnerABVChain(spawn=(0, 150), count=12)
+        self.figures = SpawnerABVChain(spawn=(0, 150), count=12, rng=self.rng)
+        self.tessellate()
+
+    def knobs(self):
+        return [Knob('arc segment', [2, 4, 8], self.set_arc_segment)]
+
+    def set_arc_segment(self, segment: int):
+        self.arc_segment = segment
+        self.tessellate()
+
+    def tessellate(self):
+        """Перестраивает все дуги сцены, включая вложенные в буквы, с текущей длиной звена"""
+        models = [self.letterB, self.figures]
+        while models:
+            model = models.pop()
+            if isinstance(model, ShearedArc):
+                model.tessellate(self.arc_segment)
+            models += getattr(model, 'shapes', [])
 
     def on_exit(self):
         self.renderer.clear_all()
@@ -52,7 +74,7 @@ class TransformationScene(Scene):
         if self.arc.r < 5:
             self.mult = 1.01
         self.arc.scale(self.mult)
-        d = np.random.randint(-5, 6, 2)
+        d = self.rng.integers(-5, 6, 2)
         self.letterA.move_on(d)
         self.letterA2.shear((self.steps[self.c_s]))
         self.c_s += 1
@@ -60,4 +82,7 @@ class TransformationScene(Scene):
         self.letterB.rotate_by_dot(1, (0, 0))
         self.letterB.rotate(-2)
         self.chain.update(self.mouse_x, self.mouse_y, 20)
+        count = len(self.figures.shapes)
         self.figures.update()
+        if len(self.figures.shapes) != count:
+            self.tessellate()  # Новые буквы строятся с длиной звена по умолчанию
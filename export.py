@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+from time import time
+
+import numpy as np
+
+from geometry.noise import fbm_tiled
+
+
+# Формат файла по расширению: .npy - float32 с заголовком NumPy, .pgm - 16-битный P5, .raw - uint16 без заголовка
+FORMATS = ('.npy', '.pgm', '.raw')
+
+
+def open_output(path: str, width: int, height: int) -> np.ndarray:
+    """Отображает файл результата в память; на диске он растёт по мере записи полос"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(height, width))
+
+    # PGM хранит 16-битные отсчёты в big-endian, raw-карты высот движков обычно little-endian
+    header = f'P5\n{width} {height}\n65535\n'.encode('ascii') if ext == '.pgm' else b''
+    dtype = np.dtype('>u2') if ext == '.pgm' else np.dtype('<u2')
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + width * height * dtype.itemsize)
+    return np.memmap(path, dtype=dtype, mode='r+', offset=len(header), shape=(height, width))
+
+
+def quantizer(low: float, high: float):
+    """Переводит значения шума из [low, high] в 16-битные отсчёты"""
+    def transform(noise: np.ndarray) -> np.ndarray:
+        levels = (noise - low) * (65535 / (high - low))
+        np.clip(levels, 0, 65535, out=levels)
+        return np.rint(levels, out=levels).astype(np.uint16)
+    return transform
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Экспорт карты высот из фрактального шума Перлина без окна")
+    parser.add_argument('output', help="файл результата: " + ", ".join(FORMATS))
+    parser.add_argument('--size', type=int, nargs='+', default=[4096], metavar='N',
+                        help="ширина и высота в пикселях (одно число - квадрат)")
+    parser.add_argument('--cells', type=float, default=8, help="клеток решётки на --scale пикселей в первой октаве")
+    parser.add_argument('--scale', type=float, default=None, help="пикселей на --cells клеток, по умолчанию размер карты")
+    parser.add_argument('--octaves', type=int, default=10)
+    parser.add_argument('--persistence', type=float, default=0.5)
+    parser.add_argument('--lacunarity', type=float, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--periodic', action='store_true',
+                        help="бесшовно повторяющаяся карта на хранимых решётках (память растёт с числом октав)")
+    parser.add_argument('--range', type=float, nargs=2, default=[-1., 1.], metavar=('LOW', 'HIGH'),
+                        help="значения шума, переводимые в 0 и 65535 для .pgm и .raw")
+    parser.add_argument('--band', type=int, default=64, help="строк в одной полосе")
+    parser.add_argument('--workers', type=int, default=None, help="число потоков, по умолчанию по числу ядер")
+    args = parser.parse_args(argv)
+
+    if os.path.splitext(args.output)[1].lower() not in FORMATS:
+        parser.error(f"unsupported output format, expected one of {', '.join(FORMATS)}")
+    if len(args.size) > 2:
+        parser.error("--size takes one or two numbers")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    width, height = args.size[0], args.size[-1]
+    out = open_output(args.output, width, height)
+    transform = None if args.output.lower().endswith('.npy') else quantizer(*args.range)
+
+    start = time()
+
+    def progress(done):
+        print(f"\r{100 * done:5.1f}%  {time() - start:7.1f} s", end='', file=sys.stderr, flush=True)
+
+    # Полосы пишутся прямо в отображённый файл, в памяти одновременно только полосы работающих потоков
+    fbm_tiled(width, height, args.cells, args.octaves, args.persistence, args.lacunarity, seed=args.seed,
+              scale=args.scale, progress=progress, workers=args.workers, band=args.band, out=out,
+              wrap=args.periodic, transform=transform)
+    out.flush()
+    print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
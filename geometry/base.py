@@ -6,6 +6,8 @@ from renderers.shape_render import RenderManager
 
 class BaseModel:
     w, h = None, None
+    batched = False  # Рендер рисует такие объекты пачкой через draw_points, а не через render
+    solid = True  # Все пиксели объекта цвета color; иначе статический слой с ним кэшируется с альфой
 
     def __init__(self, color: tuple[int, int, int]):
         self.__color = color
@@ -15,6 +17,11 @@ class BaseModel:
     def get_new_coors(old: tuple[int, int]) -> tuple[int, int]:
         return int(old[0] + BaseModel.w // 2), int(BaseModel.h // 2 - old[1])
 
+    @staticmethod
+    def get_new_coors_array(old: np.ndarray) -> np.ndarray:
+        """get_new_coors для массива точек (N, 2+) сразу"""
+        return np.column_stack((old[:, 0] + BaseModel.w // 2, BaseModel.h // 2 - old[:, 1])).astype(int)
+
     @staticmethod
     def get_old_coors(new: tuple[int, int]) -> tuple[int, int]:
         return int(new[0] - BaseModel.w // 2), int(BaseModel.h // 2 - new[1])
@@ -22,12 +29,27 @@ class BaseModel:
     def render(self, surface):
         pass  # Переопределяется в дочерних классах
 
+    @property
+    def aabb(self) -> tuple[float, float, float, float] | None:
+        """Охватывающий прямоугольник (x_min, y_min, x_max, y_max) в мировых координатах; None - неизвестен"""
+        return None
+
+    @property
+    def bbox(self):
+        """Прямоугольник экрана, который занимает объект; None - неизвестен, и изменение перерисует весь экран"""
+        return None
+
+    def _invalidate(self):
+        """Вызывается перед любым изменением, влияющим на отрисовку"""
+        pass  # Переопределяется в дочерних классах
+
     @property
     def color(self):
         return self.__color
 
     @color.setter
     def color(self, color: tuple[int, int, int]):
+        self._invalidate()
         self.__color = color
 
     @property
@@ -36,6 +58,7 @@ class BaseModel:
 
     @visible.setter
     def visible(self, visible: bool):
+        self._invalidate()
         self.__visible = visible
 
     @property
@@ -66,12 +89,39 @@ class BaseModel:
 
 class BaseGeoModel(BaseModel):
     def __init__(self, *args, **kwargs):
+        self._aabb: tuple[float, float, float, float] | None = None  # Считается при первом обращении после изменения
         self.manager = RenderManager()
-        self.manager.register(self, layer=kwargs.get('layer', BACKGROUND))
+        self.handle = self.manager.register(self, layer=kwargs.get('layer', BACKGROUND))
         if kwargs.get('coors') is not None:
             self.coors = self._generalized_mod(kwargs.get('coors'))
         super().__init__(color=kwargs.get('color'))
 
+    @property
+    def coors(self) -> np.ndarray:
+        return self.__coors
+
+    @coors.setter
+    def coors(self, coors: np.ndarray):
+        self._invalidate()
+        self.__coors = coors
+
+    @property
+    def aabb(self):
+        if self._aabb is None:
+            self._aabb = self._extent()
+        return self._aabb
+
+    def _extent(self) -> tuple[float, float, float, float] | None:
+        """Охватывающий прямоугольник по вершинам"""
+        coors = np.atleast_2d(self.coors)
+        (x_min, y_min), (x_max, y_max) = coors[:, :2].min(axis=0), coors[:, :2].max(axis=0)
+        return float(x_min), float(y_min), float(x_max), float(y_max)
+
+    def _invalidate(self):
+        # Старое место объекта и новое попадут в перерисовку следующего кадра
+        self._aabb = None
+        self.manager.invalidate(self)
+
     def _generalized_mod(self, coors: tuple[int, int]):
         """Обобщённые координаты для ломанной точки"""
         return np.hstack((coors, (1, )))
@@ -85,7 +135,11 @@ class BaseGeoModel(BaseModel):
             [s - k * np.sin(np.deg2rad(alpha)), k * np.cos(np.deg2rad(alpha)), 0],
             [d[0],                              d[1],                          1]
         ])
+        box = self._aabb
         self.coors = self.coors.dot(f)
+        if box is not None and alpha == 0 and k == 1 and s == 0:
+            # Сдвиг переносит прямоугольник целиком, обходить вершины заново не нужно
+            self._aabb = (box[0] + d[0], box[1] + d[1], box[2] + d[0], box[3] + d[1])
 
     def move_on(self, d: tuple[int | float, int | float]):
         self.abstract_transformation(0, d, 1)
@@ -130,6 +184,15 @@ class BaseShapeModel(BaseModel):
         for shape in self.shapes:
             shape.visible = visible
 
+    @property
+    def aabb(self):
+        """Объединение прямоугольников частей фигуры"""
+        boxes = [shape.aabb for shape in self.shapes]
+        if not boxes or None in boxes:
+            return None
+        x_min, y_min, x_max, y_max = zip(*boxes)
+        return min(x_min), min(y_min), max(x_max), max(y_max)
+
     @property
     def _center(self):
         center = np.array([0, 0], dtype=np.float64)
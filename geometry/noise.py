@@ -0,0 +1,357 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import cpu_count
+from typing import Callable
+
+import numpy as np
+
+
+def fade(t: np.ndarray) -> np.ndarray:
+    """
+    Сглаживание Перлина 6t^5 - 15t^4 + 10t^3
+    :param t: координата внутри клетки решётки, в [0, 1)
+    """
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    return a + t * (b - a)
+
+
+def random_gradients(grid_size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Решётка случайных единичных градиентов
+    :param grid_size: число узлов решётки по каждой оси
+    :param rng: генератор случайных чисел
+    :returns: массив формы (grid_size, grid_size, 2)
+    """
+    thetas = rng.uniform(0, 2 * np.pi, (grid_size, grid_size))
+    return np.stack([np.cos(thetas), np.sin(thetas)], axis=-1)
+
+
+def octave_gradients(cells: int, octaves: int, lacunarity: int | float = 2,
+                     seed: int | np.random.Generator | None = None) -> list[np.ndarray]:
+    """
+    Решётки градиентов всех октав фрактального шума
+    :param cells: клеток решётки вдоль стороны поля на первой октаве
+    :param octaves: число октав
+    :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+    :param seed: зерно или генератор; None - случайное
+    """
+    rng = np.random.default_rng(seed)
+    return [random_gradients(int(cells * lacunarity ** n) + 1, rng) for n in range(octaves)]
+
+
+def hash_seed(seed: int | np.random.Generator | None) -> int:
+    """Целочисленный ключ хешированной решётки; генератор или None дают случайный"""
+    if isinstance(seed, (int, np.integer)):
+        return int(seed) & 0xFFFFFFFFFFFFFFFF
+    return int(np.random.default_rng(seed).integers(2 ** 63))
+
+
+def hashed_gradients(x0: int, y0: int, nx: int, ny: int, key: int, octave: int = 0) -> np.ndarray:
+    """
+    Блок неограниченной решётки единичных градиентов; угол каждого узла - хеш от (x, y, key, octave),
+    поэтому любой блок строится независимо и соседние блоки согласованы
+    :param x0: первый узел по x
+    :param y0: первый узел по y
+    :param nx: число узлов по x
+    :param ny: число узлов по y
+    :param key: ключ решётки, см. hash_seed
+    :param octave: номер октавы, у каждой октавы своя решётка
+    :returns: массив формы (nx, ny, 2)
+    """
+    ix = np.arange(x0, x0 + nx, dtype=np.int64).view(np.uint64)[:, np.newaxis]
+    iy = np.arange(y0, y0 + ny, dtype=np.int64).view(np.uint64)[np.newaxis, :]
+    salt = np.uint64((key * 0x9E3779B97F4A7C15 + octave * 0xD6E8FEB86659FD93) & 0xFFFFFFFFFFFFFFFF)
+    # Финализатор splitmix64 над смешанными координатами узла
+    h = ix * np.uint64(0xC2B2AE3D27D4EB4F) ^ iy * np.uint64(0x165667B19E3779F9) ^ salt
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    thetas = (h >> np.uint64(11)).astype(np.float64) * (2 * np.pi / 2 ** 53)
+    return np.stack([np.cos(thetas), np.sin(thetas)], axis=-1)
+
+
+def lattice_coords(start: int, length: int, octave_cells: int | float, scale: int | float,
+                   offset: int | float = 0, wrap: bool = True) -> np.ndarray:
+    """
+    Номера пикселей в координатах решётки одной октавы
+    :param start: номер первого пикселя
+    :param length: число пикселей
+    :param octave_cells: клеток решётки на `scale` пикселей на этой октаве
+    :param scale: размер поля в пикселях, на который растянута решётка
+    :param offset: сдвиг в клетках решётки
+    :param wrap: взять по модулю периода октавы
+    """
+    pixels = np.arange(start, start + length, dtype=np.float64)
+    coords = octave_cells * pixels / scale + offset
+    return coords % octave_cells if wrap else coords
+
+
+def perlin(xs: np.ndarray, ys: np.ndarray, vecs: np.ndarray) -> np.ndarray:
+    """
+    Классический двумерный шум Перлина на сетке xs × ys.
+    Интерполяция по x зависит только от строки решётки, поэтому она считается один раз на каждую задетую строку
+    (в виде p + q * dy) и затем раздаётся строкам пикселей
+    :param xs: координаты столбцов в решётке
+    :param ys: координаты строк в решётке
+    :param vecs: решётка градиентов формы (nx, ny, 2)
+    :returns: массив формы (len(ys), len(xs))
+    """
+    ind_x, ind_y = xs.astype(np.intp), ys.astype(np.intp)
+    dx, dy = xs - ind_x, ys - ind_y
+    u, v = fade(dx), fade(dy)
+    ix0, ix1 = ind_x % vecs.shape[0], (ind_x + 1) % vecs.shape[0]
+
+    # Только строки решётки, между которыми лежат отсчёты: узкая полоса не строит всю таблицу
+    lattice_rows, iy = np.unique(np.concatenate((ind_y % vecs.shape[1], (ind_y + 1) % vecs.shape[1])),
+                                 return_inverse=True)
+    iy0, iy1 = iy[:len(ys)], iy[len(ys):]
+
+    gx = np.ascontiguousarray(vecs[:, lattice_rows, 0].T)
+    gy = np.ascontiguousarray(vecs[:, lattice_rows, 1].T)
+    p = lerp(gx[:, ix0] * dx, gx[:, ix1] * (dx - 1), u)
+    q = lerp(gy[:, ix0], gy[:, ix1], u)
+
+    dy0, dy1 = dy[:, np.newaxis], (dy - 1)[:, np.newaxis]
+    return lerp(p[iy0] + q[iy0] * dy0, p[iy1] + q[iy1] * dy1, v[:, np.newaxis])
+
+
+def hashed_perlin(xs: np.ndarray, ys: np.ndarray, key: int, octave: int = 0) -> np.ndarray:
+    """
+    Шум Перлина на неограниченной хешированной решётке; строятся только узлы вокруг xs × ys
+    :param xs: координаты столбцов в решётке
+    :param ys: координаты строк в решётке
+    :param key: ключ решётки, см. hash_seed
+    :param octave: номер октавы
+    :returns: массив формы (len(ys), len(xs))
+    """
+    x0, y0 = int(np.floor(xs.min())), int(np.floor(ys.min()))
+    nx, ny = int(np.floor(xs.max())) - x0 + 2, int(np.floor(ys.max())) - y0 + 2
+    return perlin(xs - x0, ys - y0, hashed_gradients(x0, y0, nx, ny, key, octave))
+
+
+def amplitude_sum(octaves: int, persistence: int | float) -> float:
+    """Сумма амплитуд октав, по ней fBm нормализуется в [-1, 1]"""
+    return float(sum(persistence ** n for n in range(octaves)))
+
+
+def _octave_fields(width, height, cells, octaves, lacunarity, offset, seed, vecs, scale, origin, wrap):
+    """Шум Перлина каждой октавы по порядку"""
+    if scale is None:
+        scale = max(width, height)
+    if wrap and vecs is None:
+        vecs = octave_gradients(cells, octaves, lacunarity, seed)
+    key = None if wrap else hash_seed(seed)
+    for n in range(octaves):
+        octave_cells = cells * lacunarity ** n
+        xs = lattice_coords(origin[0], width, octave_cells, scale, offset[0], wrap)
+        ys = lattice_coords(origin[1], height, octave_cells, scale, offset[1], wrap)
+        yield perlin(xs, ys, vecs[n]) if wrap else hashed_perlin(xs, ys, key, n)
+
+
+def octave_stack(width: int, height: int, cells: int = 8, octaves: int = 4, lacunarity: int | float = 2,
+                 offset: tuple[int | float, int | float] = (0, 0),
+                 seed: int | np.random.Generator | None = None,
+                 vecs: list[np.ndarray] | None = None,
+                 scale: int | float | None = None,
+                 progress: Callable[[float], None] | None = None,
+                 origin: tuple[int, int] = (0, 0), wrap: bool = True) -> np.ndarray:
+    """
+    Невзвешенные октавы Перлина фрактального шума
+    :param width: ширина поля в пикселях
+    :param height: высота поля в пикселях
+    :param cells: клеток решётки на `scale` пикселей на первой октаве
+    :param octaves: число октав
+    :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+    :param offset: сдвиг (x, y) в клетках решётки
+    :param seed: зерно или генератор градиентов
+    :param vecs: готовые решётки градиентов, с ними `seed` не используется
+    :param scale: сколько пикселей покрывает решётка первой октавы, по умолчанию max(width, height)
+    :param progress: вызывается с долей готового после каждой октавы
+    :param origin: пиксель (x, y) первого отсчёта, чтобы считать окно большего поля
+    :param wrap: периодическое поле на хранимых случайных решётках; False - неограниченное поле
+                 на хешированных решётках с ключом `seed`
+    :returns: массив формы (octaves, height, width)
+    """
+    stack = np.empty((octaves, height, width), dtype=np.float64)
+    octave_fields = _octave_fields(width, height, cells, octaves, lacunarity, offset, seed, vecs, scale, origin, wrap)
+    for n, octave in enumerate(octave_fields):
+        stack[n] = octave
+        if progress is not None:
+            progress((n + 1) / octaves)
+    return stack
+
+
+def fbm(width: int, height: int, cells: int = 8, octaves: int = 4, persistence: int | float = 0.5,
+        lacunarity: int | float = 2, offset: tuple[int | float, int | float] = (0, 0),
+        seed: int | np.random.Generator | None = None,
+        vecs: list[np.ndarray] | None = None,
+        scale: int | float | None = None,
+        progress: Callable[[float], None] | None = None,
+        origin: tuple[int, int] = (0, 0), wrap: bool = True) -> np.ndarray:
+    """
+    Фрактальное броуновское движение (fBm) на шуме Перлина, нормализованное в [-1, 1]
+    :param width: ширина поля в пикселях
+    :param height: высота поля в пикселях
+    :param cells: клеток решётки на `scale` пикселей на первой октаве
+    :param octaves: число октав
+    :param persistence: множитель амплитуды от октавы к октаве
+    :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+    :param offset: сдвиг (x, y) в клетках решётки
+    :param seed: зерно или генератор градиентов
+    :param vecs: готовые решётки градиентов, с ними `seed` не используется
+    :param scale: сколько пикселей покрывает решётка первой октавы, по умолчанию max(width, height)
+    :param progress: вызывается с долей готового после каждой октавы
+    :param origin: пиксель (x, y) первого отсчёта, чтобы считать окно большего поля
+    :param wrap: периодическое поле на хранимых случайных решётках; False - неограниченное поле
+                 на хешированных решётках с ключом `seed`
+    :returns: массив формы (height, width)
+    """
+    noise = np.zeros((height, width), dtype=np.float64)
+    octave_fields = _octave_fields(width, height, cells, octaves, lacunarity, offset, seed, vecs, scale, origin, wrap)
+    for n, octave in enumerate(octave_fields):
+        noise += persistence ** n * octave
+        if progress is not None:
+            progress((n + 1) / octaves)
+    noise /= amplitude_sum(octaves, persistence)
+    return noise
+
+
+def fbm_tiled(width: int, height: int, cells: int = 8, octaves: int = 4, persistence: int | float = 0.5,
+              lacunarity: int | float = 2, offset: tuple[int | float, int | float] = (0, 0),
+              seed: int | np.random.Generator | None = None,
+              vecs: list[np.ndarray] | None = None,
+              scale: int | float | None = None,
+              progress: Callable[[float], None] | None = None,
+              workers: int | None = None, band: int = 256,
+              out: np.ndarray | None = None, wrap: bool = True,
+              transform: Callable[[np.ndarray], np.ndarray] | None = None) -> np.ndarray:
+    """
+    fBm, считаемый полосами строк в пуле потоков (NumPy отпускает GIL внутри своих операций).
+    Промежуточные массивы ограничены размером полосы, целиком поле хранит только `out`
+    :param width: ширина поля в пикселях
+    :param height: высота поля в пикселях
+    :param cells: клеток решётки на `scale` пикселей на первой октаве
+    :param octaves: число октав
+    :param persistence: множитель амплитуды от октавы к октаве
+    :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+    :param offset: сдвиг (x, y) в клетках решётки
+    :param seed: зерно или генератор градиентов
+    :param vecs: готовые решётки градиентов, с ними `seed` не используется
+    :param scale: сколько пикселей покрывает решётка первой октавы, по умолчанию max(width, height)
+    :param progress: вызывается с долей готового после каждой полосы
+    :param workers: число потоков, по умолчанию os.cpu_count()
+    :param band: строк в одной задаче
+    :param out: массив формы (height, width), в который пишется результат, например отображение файла в память
+    :param wrap: периодическое поле на хранимых случайных решётках; False - неограниченное поле
+                 на хешированных решётках с ключом `seed`
+    :param transform: применяется к каждой полосе перед записью в `out`, например квантование
+    :returns: `out` или новый массив float64 формы (height, width)
+    """
+    if wrap and vecs is None:
+        vecs = octave_gradients(cells, octaves, lacunarity, seed)
+    if not wrap:
+        seed = hash_seed(seed)  # Один ключ на все полосы
+    if scale is None:
+        scale = max(width, height)
+    if out is None:
+        out = np.empty((height, width), dtype=np.float64)
+    if workers is None:
+        workers = cpu_count() or 1
+
+    def fill(y0):
+        rows = min(band, height - y0)
+        noise = fbm(width, rows, cells, octaves, persistence, lacunarity, offset,
+                    seed, vecs, scale, origin=(0, y0), wrap=wrap)
+        out[y0:y0 + rows] = noise if transform is None else transform(noise)
+
+    bands = range(0, height, band)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fbm-band") as executor:
+        futures = [executor.submit(fill, y0) for y0 in bands]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if progress is not None:
+                progress(done / len(futures))
+    return out
+
+
+def perpendicular_gradients(vecs: list[np.ndarray]) -> list[np.ndarray]:
+    """Все градиенты всех решёток, повёрнутые на 90 градусов против часовой стрелки"""
+    return [np.stack([-octave[..., 1], octave[..., 0]], axis=-1) for octave in vecs]
+
+
+class RotatingNoise:
+    def __init__(self, width: int, height: int, cells: int = 8, octaves: int = 4, persistence: int | float = 0.5,
+                 lacunarity: int | float = 2, offset: tuple[int | float, int | float] = (0, 0),
+                 seed: int | np.random.Generator | None = None,
+                 vecs: list[np.ndarray] | None = None,
+                 scale: int | float | None = None,
+                 progress: Callable[[float], None] | None = None,
+                 bases: np.ndarray | None = None):
+        """
+        fBm, градиенты каждой октавы которого поворачиваются на общий угол.
+        Шум Перлина линеен по градиентам, а градиент, повёрнутый на phi, равен cos(phi) * g + sin(phi) * g_perp,
+        поэтому каждый кадр - взвешенная сумма 2 * octaves заранее посчитанных базисов
+        :param width: ширина поля в пикселях
+        :param height: высота поля в пикселях
+        :param cells: клеток решётки на `scale` пикселей на первой октаве
+        :param octaves: число октав
+        :param persistence: множитель амплитуды от октавы к октаве
+        :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+        :param offset: сдвиг (x, y) в клетках решётки
+        :param seed: зерно или генератор градиентов
+        :param vecs: готовые решётки градиентов без поворота, с ними `seed` не используется
+        :param scale: сколько пикселей покрывает решётка первой октавы, по умолчанию max(width, height)
+        :param progress: вызывается с долей готового после каждой октавы базиса
+        :param bases: готовые `bases` такого же RotatingNoise, с ними ничего не вычисляется
+        """
+        self.amplitudes = persistence ** np.arange(octaves) / amplitude_sum(octaves, persistence)
+        self.decimated: dict[int, np.ndarray] = {}  # step -> базисы, взятые в каждом step-м пикселе
+        if bases is not None:
+            self.bases = bases
+            return
+        if vecs is None:
+            vecs = octave_gradients(cells, octaves, lacunarity, seed)
+        args = (width, height, cells, octaves, lacunarity, offset)
+        first_half, second_half = None, None
+        if progress is not None:
+            first_half, second_half = (lambda done: progress(done / 2)), (lambda done: progress(0.5 + done / 2))
+        self.bases = np.concatenate((
+            octave_stack(*args, vecs=vecs, scale=scale, progress=first_half),
+            octave_stack(*args, vecs=perpendicular_gradients(vecs), scale=scale, progress=second_half)
+        )).astype(np.float32)
+
+    def field(self, angles: np.ndarray | list[int | float], octaves: int | None = None,
+              step: int = 1) -> np.ndarray:
+        """
+        Шум, в котором градиенты октавы n повёрнуты на angles[n]
+        :param angles: поворот каждой октавы в радианах
+        :param octaves: суммировать только первые `octaves` октав, по умолчанию все; время линейно по их числу
+        :param step: брать каждый `step`-й пиксель по обеим осям, время падает как step ** 2
+        :returns: массив float32 формы (ceil(height / step), ceil(width / step)), нормализованный в [-1, 1]
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+        count = len(self.amplitudes)
+        bases = self.bases
+        if step > 1:
+            if step not in self.decimated:
+                self.decimated[step] = np.ascontiguousarray(self.bases[:, ::step, ::step])
+            bases = self.decimated[step]
+        if octaves is None or octaves >= count:
+            weights = np.concatenate((self.amplitudes * np.cos(angles), self.amplitudes * np.sin(angles)))
+            return np.tensordot(weights.astype(np.float32), bases, axes=1)
+        # Базисы хранятся блоком для cos и блоком для sin, поэтому первые октавы - срезы, а не копии
+        cos = (self.amplitudes * np.cos(angles))[:octaves].astype(np.float32)
+        sin = (self.amplitudes * np.sin(angles))[:octaves].astype(np.float32)
+        return np.tensordot(cos, bases[:octaves], axes=1) + np.tensordot(sin, bases[count:count + octaves], axes=1)
+
+
+if __name__ == '__main__':
+    from time import time
+
+    start = time()
+    field = fbm(520, 520, octaves=4, seed=0)
+    print(f'{field.shape}: {1000 * (time() - start):.1f} ms, range [{field.min():.3f}, {field.max():.3f}]')
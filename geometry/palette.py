@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class Palette:
+    def __init__(self, stops: dict[float, tuple[int, int, int]], size: int = 1024, smooth: bool = False,
+                 low: int | float = -1, high: int | float = 1):
+        """
+        Таблица цветов для скалярных полей
+        :param stops: порог -> цвет; значение получает цвет первого порога, не меньшего его
+        :param size: число записей таблицы от `low` до `high`
+        :param smooth: линейная интерполяция между порогами вместо ступенек
+        :param low: значение поля, которому соответствует первая запись
+        :param high: значение поля, которому соответствует последняя запись
+        """
+        self.stops = dict(stops)
+        self.size = size
+        self.smooth = smooth
+        self.low, self.high = low, high
+
+        thresholds = np.array(sorted(self.stops), dtype=np.float64)
+        colors = np.array([self.stops[k] for k in sorted(self.stops)], dtype=np.float64)
+        values = np.linspace(low, high, size)
+        if smooth:
+            table = np.stack([np.interp(values, thresholds, colors[:, c]) for c in range(3)], axis=-1)
+        else:
+            table = colors[np.searchsorted(thresholds, values, side='left').clip(max=len(thresholds) - 1)]
+        self.table = np.rint(table).astype(np.uint8)
+
+    def indices(self, field: np.ndarray) -> np.ndarray:
+        """Номер записи таблицы для каждого значения поля"""
+        idx = (np.asarray(field, dtype=np.float32) - self.low) * ((self.size - 1) / (self.high - self.low))
+        np.clip(idx, 0, self.size - 1, out=idx)
+        return np.rint(idx, out=idx).astype(np.intp)
+
+    def apply(self, field: np.ndarray) -> np.ndarray:
+        """
+        Раскрашивает всё поле одной выборкой из таблицы
+        :param field: массив формы (H, W)
+        :returns: массив uint8 формы (H, W, 3)
+        """
+        return np.take(self.table, self.indices(field), axis=0)
@@ -1,6 +1,8 @@
+from math import ceil, floor
+
 import numpy as np
 import pygame
-from pygame.gfxdraw import pixel, line, arc
+from pygame.gfxdraw import pixel, arc
 
 from core.config import BACKGROUND
 from geometry.base import BaseGeoModel
@@ -16,12 +18,18 @@ class Point(BaseGeoModel):
     def render(self, surface: pygame.Surface):
         pixel(surface, *self.get_new_coors(self.coors), self.color)
 
+    @property
+    def bbox(self):
+        return pygame.Rect(self.get_new_coors(self.coors), (1, 1))
+
     @property
     def _center(self):
         return self.coors[:2]
 
 
 class Polyline(BaseGeoModel):
+    batched = True
+
     def __init__(self, coors: tuple[tuple, ...] = ((0, 0), (1, 1)),
                  color: tuple[int, int, int] = (0, 0, 0),
                  layer: str = BACKGROUND):
@@ -46,9 +54,21 @@ class Polyline(BaseGeoModel):
         self.scale_by_dot(c, k)
 
     def render(self, surface: pygame.Surface):
-        for d1, d2 in zip(self.coors[:-1], self.coors[1:]):
-            line(surface, *self.get_new_coors(d1),
-                 *self.get_new_coors(d2), self.color)
+        self.draw_points(surface, self.get_new_coors_array(self.coors).tolist(), self.color)
+
+    @staticmethod
+    def draw_points(surface: pygame.Surface, points: list[list[int]], color: tuple[int, int, int]):
+        """Одна ломаная по готовым экранным точкам за один вызов"""
+        if len(points) > 1:
+            pygame.draw.lines(surface, color, False, points)
+
+    @property
+    def bbox(self):
+        x_min, y_min, x_max, y_max = self.aabb
+        # Запас в пиксель на округление координат при отрисовке; ось y экрана направлена вниз
+        left, top = floor(x_min) + self.w // 2 - 1, self.h // 2 - ceil(y_max) - 1
+        right, bottom = ceil(x_max) + self.w // 2, self.h // 2 - floor(y_min)
+        return pygame.Rect(left, top, right - left + 2, bottom - top + 2)
 
 
 class Polygon(Polyline):
@@ -77,13 +97,25 @@ class Arc(BaseGeoModel):
         arc(surface, *self.get_new_coors(self.coors),
             int(self.r), int(360 - self.end_angle), int(360 - self.start_angle), self.color)
 
+    @property
+    def bbox(self):
+        x, y = self.get_new_coors(self.coors)
+        r = int(self.r) + 1
+        return pygame.Rect(x - r, y - r, 2 * r + 1, 2 * r + 1)
+
+    def _extent(self):
+        x, y = float(self.coors[0]), float(self.coors[1])
+        return x - self.r, y - self.r, x + self.r, y + self.r
+
     def rotate(self, alpha: int | float):
+        self._invalidate()
         self.start_angle += alpha
         self.start_angle %= 360
         self.end_angle += alpha
         self.end_angle %= 360
 
     def scale(self, k: int | float):
+        self._invalidate()
         self.r *= k
 
     def rotate_by_dot(self, alpha, d):
@@ -99,6 +131,142 @@ class Arc(BaseGeoModel):
         return self.coors[:2]
 
 
+class RasterLayer(BaseGeoModel):
+    solid = False
+
+    def __init__(self, pixels: np.ndarray,
+                 coors: tuple[int, int] = (0, 0),
+                 layer: str = BACKGROUND,
+                 size: tuple[int, int] | None = None):
+        """
+        Целое изображение, рисуемое одним blit
+        :param pixels: массив (H, W) оттенков серого или (H, W, 3) RGB, значения в [0, 255], первая строка сверху
+        :param coors: координаты центра изображения
+        :param layer: слой рендера
+        :param size: (ширина, высота) на экране; пиксели другого размера растягиваются до него smoothscale
+        """
+        self.surface: pygame.Surface | None = None
+        self.source: pygame.Surface | None = None  # Пиксели до масштабирования, если их размер не совпадает с `size`
+        self.size = size
+        self.__pixels: np.ndarray | None = None
+        super().__init__(coors=coors, color=(255, 255, 255), layer=layer)
+        self.pixels = pixels
+
+    @property
+    def pixels(self) -> np.ndarray:
+        return self.__pixels
+
+    @pixels.setter
+    def pixels(self, pixels: np.ndarray):
+        pixels = np.asarray(pixels)
+        if pixels.ndim == 2:
+            pixels = np.broadcast_to(pixels[..., np.newaxis], pixels.shape + (3, ))
+        if pixels.ndim != 3 or pixels.shape[2] != 3:
+            raise ValueError(f"Expected (H, W) or (H, W, 3) array, got shape {pixels.shape}")
+        self._invalidate()
+        self.__pixels = pixels
+        h, w = pixels.shape[:2]
+        size = self.size or (w, h)
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+        if size == (w, h):
+            pygame.surfarray.blit_array(self.surface, pixels.swapaxes(0, 1).astype(np.uint8, copy=False))
+            return
+        if self.source is None or self.source.get_size() != (w, h):
+            self.source = pygame.Surface((w, h), depth=32)
+        pygame.surfarray.blit_array(self.source, pixels.swapaxes(0, 1).astype(np.uint8, copy=False))
+        pygame.transform.smoothscale(self.source, size, self.surface)
+
+    def render(self, surface: pygame.Surface):
+        surface.blit(self.surface, self.bbox)
+
+    @property
+    def bbox(self):
+        x, y = self.get_new_coors(self.coors)
+        w, h = self.surface.get_size()
+        return pygame.Rect(x - w // 2, y - h // 2, w, h)
+
+    def _extent(self):
+        x, y = float(self.coors[0]), float(self.coors[1])
+        w, h = self.surface.get_size()
+        return x - w / 2, y - h / 2, x + w / 2, y + h / 2
+
+    @property
+    def _center(self):
+        return self.coors[:2]
+
+
+class PointCloud(BaseGeoModel):
+    solid = False
+
+    def __init__(self, coors: np.ndarray | tuple[tuple, ...],
+                 colors: np.ndarray | tuple[int, int, int] = (255, 255, 255),
+                 layer: str = BACKGROUND):
+        """
+        Множество точек в массивах: любое преобразование - одно матричное умножение для всех точек,
+        а отрисовка - одна запись в пиксели поверхности
+        :param coors: координаты точек, (N, 2)
+        :param colors: цвет каждой точки, (N, 3), или один цвет для всех
+        :param layer: слой рендера
+        """
+        coors = np.asarray(coors, dtype=np.float64)
+        self.colors = np.empty((len(coors), 3), dtype=np.uint8)
+        self.colors[:] = colors
+        color = tuple(int(c) for c in self.colors[0]) if len(coors) else (255, 255, 255)
+        super().__init__(coors=coors, color=color, layer=layer)
+
+    def _generalized_mod(self, coors: np.ndarray):
+        """Обобщённые координаты для облака точек"""
+        return np.hstack((coors, np.ones((coors.shape[0], 1))))
+
+    @BaseGeoModel.color.setter
+    def color(self, color: tuple[int, int, int]):
+        BaseGeoModel.color.fset(self, color)
+        self.colors[:] = color
+
+    def render(self, surface: pygame.Surface):
+        points = self.get_new_coors_array(self.coors)
+        w, h = surface.get_size()
+        inside = (points[:, 0] >= 0) & (points[:, 0] < w) & (points[:, 1] >= 0) & (points[:, 1] < h)
+        xs, ys, colors = points[inside, 0], points[inside, 1], self.colors[inside]
+        # Ссылки на пиксели блокируют поверхность, пока живы
+        if surface.get_bytesize() == 4:
+            # Цвета упаковываются в формат поверхности: одна запись на точку вместо трёх
+            shifts, losses = surface.get_shifts()[:3], surface.get_losses()[:3]
+            packed = np.full(len(colors), surface.get_masks()[3], dtype=np.uint32)
+            for channel in range(3):
+                packed |= (colors[:, channel].astype(np.uint32) >> losses[channel]) << shifts[channel]
+            pixels = pygame.surfarray.pixels2d(surface)
+            pixels[xs, ys] = packed
+        else:
+            pixels = pygame.surfarray.pixels3d(surface)
+            pixels[xs, ys] = colors
+        del pixels
+
+    @property
+    def bbox(self):
+        if not len(self.coors):
+            return pygame.Rect(0, 0, 0, 0)
+        x_min, y_min, x_max, y_max = self.aabb
+        # Те же отсечения к нулю, что и при переводе точек в экранные координаты
+        left, top = int(x_min + self.w // 2), int(self.h // 2 - y_max)
+        right, bottom = int(x_max + self.w // 2), int(self.h // 2 - y_min)
+        return pygame.Rect(left, top, right - left + 1, bottom - top + 1)
+
+    def _extent(self):
+        return super()._extent() if len(self.coors) else None
+
+    @property
+    def _center(self):
+        return np.mean(self.coors, axis=0)[:2]
+
+    def rotate(self, alpha):
+        self.rotate_by_dot(alpha, self._center)
+
+    def scale(self, k):
+        self.scale_by_dot(self._center, k)
+
+
 class Fractal(Polyline):
     def __init__(self, f_base: tuple[tuple[int | float, int | float]],
                  fragment: tuple[tuple[int | float, int | float]], f_level: int,
@@ -175,18 +343,38 @@ class ShearedArc(Polyline):
     def __init__(self, center: tuple[int, int] = (0, 0),
                  r: int = 10, start_angle: int = 0, end_angle: int = 180,
                  color: tuple[int, int, int] = (255, 255, 255),
-                 layer: str = BACKGROUND):
-        super().__init__(coors=self._get_coors(r, center, start_angle, end_angle), color=color, layer=layer)
+                 layer: str = BACKGROUND, segment: int | float = 2):
+        """
+        Дуга, приближённая ломаной, чтобы её можно было скашивать как любую ломаную
+        :param segment: примерная длина звена ломаной в пикселях
+        """
+        super().__init__(coors=self._get_coors(r, center, start_angle, end_angle, segment), color=color, layer=layer)
+        self.center = center
         self.r = r
         self.start_angle = start_angle
         self.end_angle = end_angle
+        self.segment = segment
+
+    def tessellate(self, segment: int | float):
+        """
+        Перестраивает дугу с другой длиной звена, сохраняя все применённые к ней преобразования
+        :param segment: примерная длина звена ломаной в пикселях
+        """
+        if segment == self.segment:
+            return
+        arc = (self.r, self.center, self.start_angle, self.end_angle)
+        # Текущие вершины - исходные, умноженные на одну аффинную матрицу; МНК восстанавливает её точно
+        transform = np.linalg.lstsq(self._generalized_mod(self._get_coors(*arc, self.segment)), self.coors,
+                                    rcond=None)[0]
+        self.segment = segment
+        self.coors = self._generalized_mod(self._get_coors(*arc, segment)).dot(transform)
 
     @staticmethod
-    def _get_coors(r, center, start_angle, end_angle):
+    def _get_coors(r, center, start_angle, end_angle, segment=2):
         start_angle = np.pi * start_angle / 180
         end_angle = np.pi * end_angle / 180
         angle_measure = r * (end_angle - start_angle)
-        n = int(angle_measure) // 2
+        n = max(int(angle_measure // segment), 2)
         angle_step = (end_angle - start_angle) / n
         coors = tuple((center[0] + r * np.cos(start_angle + i * angle_step),
                        center[1] + r * np.sin(start_angle + i * angle_step)
@@ -1,5 +1,3 @@
-import random
-
 import numpy as np
 
 from core.config import MIDDLE
@@ -187,8 +185,9 @@ class AChain(BaseShapeModel):
 
 class SpawnerABVChain(BaseShapeModel):
     def __init__(self, h: int = 50, spawn: tuple[int, int] = (0, 0), count: int = 10, time_spawn: int = 30,
-                 color: tuple[int, int, int] = (255, 0, 0)):
+                 color: tuple[int, int, int] = (255, 0, 0), rng: np.random.Generator | None = None):
         self.h = h
+        self.rng = rng if rng is not None else np.random.default_rng()  # Выбор букв и их цветов
         self.spawn_place = spawn
         self.spawn_count = count
         self.time_spawn = time_spawn
@@ -203,17 +202,8 @@ class SpawnerABVChain(BaseShapeModel):
 
     def update(self):
         if self.spawner.update(len(self.shapes)):
-            self.shapes.append(
-                random.choice(
-                    [LetterAWithBase, LetterBWithBase, LetterVWithBase]
-                              )(
-                    self.h, self.spawn_place,
-                    (random.randint(0, 255),
-                     random.randint(0, 255),
-                     random.randint(0, 255)
-                     )
-                )
-            )
+            letter = [LetterAWithBase, LetterBWithBase, LetterVWithBase][self.rng.integers(3)]
+            self.shapes.append(letter(self.h, self.spawn_place, tuple(int(c) for c in self.rng.integers(0, 256, 3))))
         self.rotate_by_dot(1, (0, 0))
         for shape in self.shapes:
             if hasattr(shape, 'current_state'):
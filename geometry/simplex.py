@@ -0,0 +1,149 @@
+import numpy as np
+
+from geometry.noise import amplitude_sum
+
+
+# Коэффициенты скоса и обратного скоса: квадратная (кубическая) решётка переводится в симплексы и обратно
+F2 = (np.sqrt(3) - 1) / 2
+G2 = (3 - np.sqrt(3)) / 6
+F3 = 1 / 3
+G3 = 1 / 6
+
+# Градиенты к серединам рёбер куба; двумерный шум берёт их часть (x, y)
+GRAD3 = np.array([[1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+                  [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+                  [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1]], dtype=np.float64)
+
+
+class SimplexNoise:
+    def __init__(self, seed: int | np.random.Generator | None = None):
+        """
+        Двумерный и трёхмерный симплекс-шум, векторизованный по массивам координат отсчётов.
+        Отсчёт смешивает 3 (в 3D - 4) вершины симплекса вместо 4 (8) вершин клетки у шума Перлина,
+        и у симплексной решётки нет швов вдоль осей
+        :param seed: зерно или генератор таблицы перестановок
+        """
+        perm = np.random.default_rng(seed).permutation(256)
+        # Удвоена, чтобы сумма двух индексов по модулю 256 не требовала ещё одного взятия остатка
+        self.perm = np.concatenate((perm, perm)).astype(np.intp)
+        # Компоненты градиента каждой ячейки таблицы: одна выборка на компоненту вместо ячейка -> индекс -> градиент
+        self.grads = [np.ascontiguousarray(GRAD3[self.perm % 12, axis], dtype=np.float32) for axis in range(3)]
+
+    def noise2(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Двумерный симплекс-шум
+        :param x: координаты x отсчётов в клетках решётки
+        :param y: координаты y отсчётов, согласуются с x по правилам broadcasting
+        :returns: значения примерно в [-1, 1] общей формы x и y
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        s = (x + y) * F2
+        i, j = np.floor(x + s), np.floor(y + s)
+        t = (i + j) * G2
+        # Смещения внутри клетки малы: float32 вдвое сокращает обращения к памяти во всём, что ниже
+        x0, y0 = (x - (i - t)).astype(np.float32), (y - (j - t)).astype(np.float32)
+
+        # Средняя вершина зависит от того, в нижнем или верхнем треугольнике скошенной клетки лежит отсчёт
+        i1 = (x0 > y0).astype(np.intp)
+        j1 = 1 - i1
+        ii, jj = i.astype(np.intp) & 255, j.astype(np.intp) & 255
+        perm = self.perm
+
+        corners = (
+            (x0, y0, ii + perm[jj]),
+            (x0 - i1 + np.float32(G2), y0 - j1 + np.float32(G2), ii + i1 + perm[jj + j1]),
+            (x0 - np.float32(1 - 2 * G2), y0 - np.float32(1 - 2 * G2), ii + 1 + perm[jj + 1])
+        )
+        noise = np.zeros(x.shape, dtype=np.float32)
+        gx, gy, _ = self.grads
+        for cx, cy, slot in corners:
+            falloff = np.maximum(np.float32(0.5) - cx * cx - cy * cy, 0)
+            falloff *= falloff
+            noise += falloff * falloff * (gx[slot] * cx + gy[slot] * cy)
+        return 70 * noise.astype(np.float64)
+
+    def noise3(self, x: np.ndarray, y: np.ndarray, z: np.ndarray | int | float) -> np.ndarray:
+        """
+        Трёхмерный симплекс-шум; если z - время, двумерное поле анимируется без перестройки решётки
+        :param x: координаты x отсчётов в клетках решётки
+        :param y: координаты y отсчётов
+        :param z: координаты z отсчётов; x, y и z согласуются по правилам broadcasting
+        :returns: значения примерно в [-1, 1] общей формы x, y и z
+        """
+        x, y, z = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (x, y, z)))
+        s = (x + y + z) * F3
+        i, j, k = np.floor(x + s), np.floor(y + s), np.floor(z + s)
+        t = (i + j + k) * G3
+        x0, y0, z0 = ((c - (n - t)).astype(np.float32) for c, n in ((x, i), (y, j), (z, k)))
+
+        # Какой из 6 тетраэдров скошенного куба: средние вершины сдвигаются вдоль наибольших смещений
+        xy, yz, xz = x0 >= y0, y0 >= z0, x0 >= z0
+        i1 = (xy & (yz | xz)).astype(np.intp)
+        j1 = (~xy & yz).astype(np.intp)
+        k1 = 1 - i1 - j1
+        i2 = (xy | (yz & xz)).astype(np.intp)
+        j2 = (~xy | yz).astype(np.intp)
+        k2 = (~yz | (~xy & ~xz)).astype(np.intp)
+        ii, jj, kk = i.astype(np.intp) & 255, j.astype(np.intp) & 255, k.astype(np.intp) & 255
+        perm = self.perm
+        g1, g2, g3 = np.float32(G3), np.float32(2 * G3), np.float32(1 - 3 * G3)
+
+        corners = (
+            (x0, y0, z0, ii + perm[jj + perm[kk]]),
+            (x0 - i1 + g1, y0 - j1 + g1, z0 - k1 + g1, ii + i1 + perm[jj + j1 + perm[kk + k1]]),
+            (x0 - i2 + g2, y0 - j2 + g2, z0 - k2 + g2, ii + i2 + perm[jj + j2 + perm[kk + k2]]),
+            (x0 - g3, y0 - g3, z0 - g3, ii + 1 + perm[jj + 1 + perm[kk + 1]])
+        )
+        noise = np.zeros(x.shape, dtype=np.float32)
+        gx, gy, gz = self.grads
+        for cx, cy, cz, slot in corners:
+            falloff = np.maximum(np.float32(0.6) - cx * cx - cy * cy - cz * cz, 0)
+            falloff *= falloff
+            noise += falloff * falloff * (gx[slot] * cx + gy[slot] * cy + gz[slot] * cz)
+        return 32 * noise.astype(np.float64)
+
+
+def simplex_fbm(width: int, height: int, cells: int | float = 8, octaves: int = 4,
+                persistence: int | float = 0.5, lacunarity: int | float = 2,
+                offset: tuple[int | float, int | float] = (0, 0),
+                seed: int | np.random.Generator | None = None,
+                noise: SimplexNoise | None = None,
+                scale: int | float | None = None,
+                time: int | float | None = None,
+                origin: tuple[int, int] = (0, 0)) -> np.ndarray:
+    """
+    Фрактальный (fBm) симплекс-шум на сетке пикселей, симплексный аналог noise.fbm
+    :param width: ширина поля в пикселях
+    :param height: высота поля в пикселях
+    :param cells: клеток решётки на `scale` пикселей на первой октаве
+    :param octaves: число октав
+    :param persistence: множитель амплитуды от октавы к октаве
+    :param lacunarity: во сколько раз растёт число клеток от октавы к октаве
+    :param offset: сдвиг (x, y) в клетках решётки
+    :param seed: зерно или генератор таблицы перестановок
+    :param noise: готовый SimplexNoise, с ним `seed` не используется
+    :param scale: сколько пикселей покрывает решётка первой октавы, по умолчанию max(width, height)
+    :param time: третья координата в клетках решётки первой октавы; None - двумерный шум
+    :param origin: пиксель (x, y) первого отсчёта, чтобы считать окно большего поля
+    :returns: массив формы (height, width) со значениями примерно в [-1, 1]
+    """
+    if noise is None:
+        noise = SimplexNoise(seed)
+    if scale is None:
+        scale = max(width, height)
+    xs = np.arange(origin[0], origin[0] + width, dtype=np.float64)[np.newaxis, :]
+    ys = np.arange(origin[1], origin[1] + height, dtype=np.float64)[:, np.newaxis]
+
+    field = np.zeros((height, width), dtype=np.float64)
+    for n in range(octaves):
+        frequency = cells * lacunarity ** n / scale
+        # Октавы разнесены, чтобы узлы их решёток не совпадали
+        shift = 101.3 * n
+        x, y = frequency * xs + offset[0] + shift, frequency * ys + offset[1] + shift
+        if time is None:
+            octave = noise.noise2(x, y)
+        else:
+            octave = noise.noise3(x, y, time * lacunarity ** n + shift)
+        field += persistence ** n * octave
+    field /= amplitude_sum(octaves, persistence)
+    return field
@@ -1,10 +1,42 @@
-from core.engine import Engine
+import argparse
+import os
+from time import perf_counter
 
 
 def main():
-    engine = Engine()
+    parser = argparse.ArgumentParser(description="Geometry App")
+    parser.add_argument('--record', metavar='FILE', help="записать ввод в файл для повтора")
+    parser.add_argument('--replay', metavar='FILE', help="воспроизвести записанный ввод без ограничения FPS")
+    parser.add_argument('--seed', type=int, help="зерно случайных чисел сцен")
+    parser.add_argument('--headless', action='store_true', help="без окна (SDL_VIDEODRIVER=dummy)")
+    parser.add_argument('--trace', action='store_true', help="по завершении сохранить трассу кадров")
+    args = parser.parse_args()
+
+    if args.headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'  # Должно быть задано до pygame.init()
+
+    from core.engine import Engine
+    from core.replay import InputReplay
+
+    replay = InputReplay(args.replay) if args.replay else None
+    engine = Engine(*replay.size) if replay else Engine()
+    if replay:
+        engine.play(replay)
+    elif args.seed is not None:
+        engine.seed = args.seed
+    if args.record:
+        engine.record(args.record)
     engine.scene_manager.init_scenes()
+
+    start = perf_counter()
     engine.run()
+    elapsed = perf_counter() - start
+    if replay:
+        frames = engine.profiler.frames
+        print(f"Replayed {replay.frame} recorded frames: {frames} frames in {elapsed:.2f} s "
+              f"({frames / elapsed:.1f} FPS)")
+    if args.trace:
+        print(f"Frame trace saved to {engine.profiler.dump()}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,185 @@
+from collections import OrderedDict
+
+import pygame
+
+from core.meta import SingletonMeta
+
+
+class TextCache(metaclass=SingletonMeta):
+    def __init__(self, max_texts: int = 512):
+        self.fonts: dict[int, pygame.font.Font] = {}  # Размер -> шрифт; создание шрифта дороже отрисовки строки
+        self.texts: OrderedDict[tuple[str, int, tuple], pygame.Surface] = OrderedDict()
+        self.max_texts = max_texts  # Сверх этого вытесняются давно не использованные строки
+
+    def font(self, size: int) -> pygame.font.Font:
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def render(self, text: str, size: int = 24, color: tuple[int, int, int] = (255, 255, 255)) -> pygame.Surface:
+        """Поверхность строки; рисуется только при первом обращении"""
+        key = (text, size, tuple(color))
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.texts.move_to_end(key)
+            return surface
+        surface = self.font(size).render(text, True, color)
+        self.texts[key] = surface
+        if len(self.texts) > self.max_texts:
+            self.texts.popitem(last=False)
+        return surface
+
+    def glyphs(self, text: str, size: int = 24,
+               color: tuple[int, int, int] = (255, 255, 255)) -> list[pygame.Surface]:
+        """Строка по символам: для часто меняющихся чисел в кэше остаются только сами цифры"""
+        return [self.render(char, size, color) for char in text]
+
+
+class Overlay:
+    def __init__(self, anchor: str = 'topleft', position: tuple[int, int] = (10, 10), size: int = 24,
+                 glyphs: bool = False):
+        """
+        Строка текста из разноцветных частей, собранная в одну поверхность
+        :param anchor: точка прямоугольника строки, которая ставится в position (как у pygame.Rect)
+        :param position: координаты этой точки на экране
+        :param size: размер шрифта
+        :param glyphs: собирать строку из закэшированных символов, для значений, меняющихся каждый кадр
+        """
+        self.anchor = anchor
+        self.position = position
+        self.size = size
+        self.glyphs = glyphs
+        self.parts: tuple[tuple[str, tuple[int, int, int]], ...] = ()
+        self.surface: pygame.Surface | None = None  # Переиспользуется, пока в него помещается строка
+        self.rect: pygame.Rect | None = None  # Где строка рисуется сейчас
+        self.__visible = True
+        self.changed = True  # Нужно перерисовать старое и новое место строки
+
+    @property
+    def visible(self):
+        return self.__visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        if visible != self.__visible:
+            self.__visible = visible
+            self.changed = True
+
+    def set(self, *parts: tuple[str, tuple[int, int, int]]) -> bool:
+        """Меняет текст; поверхность пересобирается, только если он отличается от текущего"""
+        if parts == self.parts:
+            return False
+        self.parts = parts
+        self.changed = True
+
+        cache = TextCache()
+        surfaces = []
+        for text, color in parts:
+            if self.glyphs:
+                surfaces += cache.glyphs(text, self.size, color)
+            else:
+                surfaces.append(cache.render(text, self.size, color))
+        width = sum(surface.get_width() for surface in surfaces)
+        height = cache.font(self.size).get_linesize()
+        if self.surface is None or self.surface.get_width() < width or self.surface.get_height() < height:
+            self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        x = 0
+        for surface in surfaces:
+            # Части не перекрываются: пиксели копируются как есть, без повторного смешивания альфы
+            self.surface.blit(surface, (x, height - surface.get_height()), special_flags=pygame.BLEND_RGBA_MAX)
+            x += surface.get_width()
+
+        self.rect = pygame.Rect(0, 0, width, height)
+        setattr(self.rect, self.anchor, self.position)
+        return True
+
+    def render(self, surface: pygame.Surface):
+        if self.visible and self.rect is not None:
+            surface.blit(self.surface, self.rect, pygame.Rect(0, 0, self.rect.width, self.rect.height))
+
+
+class HUD:
+    def __init__(self):
+        self.overlays: dict[str, Overlay] = {}  # Рисуются поверх сцены в порядке добавления
+        self.drawn: dict[str, pygame.Rect | None] = {}  # Где строки нарисованы в последнем кадре
+        self.removed: list[pygame.Rect] = []  # Места удалённых строк, перерисуются в следующем кадре
+
+    def add(self, name: str, overlay: Overlay) -> Overlay:
+        self.remove(name)
+        self.overlays[name] = overlay
+        return overlay
+
+    def remove(self, name: str):
+        self.overlays.pop(name, None)
+        rect = self.drawn.pop(name, None)
+        if rect:
+            self.removed.append(rect)
+
+    def dirty_regions(self) -> list[pygame.Rect]:
+        """Старые и новые места изменившихся строк"""
+        rects = list(self.removed)
+        for name, overlay in self.overlays.items():
+            if not overlay.changed:
+                continue
+            rect = self.drawn.get(name)
+            if rect:
+                rects.append(rect)
+            if overlay.visible and overlay.rect:
+                rects.append(overlay.rect)
+        return rects
+
+    def render(self, surface: pygame.Surface, area: pygame.Rect | None = None):
+        for overlay in self.overlays.values():
+            if overlay.visible and overlay.rect and (area is None or overlay.rect.colliderect(area)):
+                overlay.render(surface)
+
+    def frame_drawn(self):
+        """Запоминает места строк; вызывается после каждого кадра"""
+        for name, overlay in self.overlays.items():
+            if overlay.changed:
+                self.drawn[name] = overlay.rect if overlay.visible else None
+                overlay.changed = False
+        self.removed.clear()
+
+
+class StripChart:
+    def __init__(self, rect: pygame.Rect, colors: list[tuple[int, int, int]], full_scale: float,
+                 marker: float | None = None):
+        """
+        Прокручиваемая диаграмма: push() сдвигает её на пиксель и дорисовывает один столбик, без новых поверхностей
+        :param rect: место на экране; ширина - число последних столбиков
+        :param colors: цвета частей столбика снизу вверх
+        :param full_scale: значение, соответствующее всей высоте
+        :param marker: уровень горизонтальной отметки, например бюджет кадра
+        """
+        self.rect = rect
+        self.colors = colors
+        self.full_scale = full_scale
+        self.marker = marker
+        self.background = (20, 20, 20)
+        self.surface = pygame.Surface(rect.size)
+        self.surface.fill(self.background)
+        self.visible = True
+        self.changed = True  # Для HUD: место диаграммы перерисовывается после каждого push()
+
+    def push(self, values):
+        """Добавляет столбик из частей values, по одной на цвет"""
+        w, h = self.rect.size
+        self.surface.scroll(-1, 0)
+        self.surface.fill(self.background, (w - 1, 0, 1, h))
+        total = 0.
+        bottom = h
+        for value, color in zip(values, self.colors):
+            total += value
+            top = h - min(int(h * total / self.full_scale), h)
+            if top < bottom:
+                self.surface.fill(color, (w - 1, top, 1, bottom - top))
+                bottom = top
+        if self.marker is not None and self.marker < self.full_scale:
+            self.surface.set_at((w - 1, h - 1 - int(h * self.marker / self.full_scale)), (255, 255, 255))
+        self.changed = True
+
+    def render(self, surface: pygame.Surface):
+        if self.visible:
+            surface.blit(self.surface, self.rect)
@@ -1,4 +1,10 @@
-from core.config import BACKGROUND, MIDDLE, FOREGROUND
+from itertools import count
+from time import perf_counter
+
+import numpy as np
+import pygame
+
+from core.config import BACKGROUND, LAYERS, STATIC_LAYERS
 from core.meta import SingletonMeta
 
 
@@ -6,27 +12,363 @@ class RenderManager(metaclass=SingletonMeta):
     def __init__(self):
         from geometry.base import BaseGeoModel
 
-        self.layers: dict[str, list[BaseGeoModel]] = {
-            BACKGROUND: [],   # Нижний слой
-            MIDDLE: [],       # Средний слой
-            FOREGROUND: []    # Верхний слой
-        }
+        # Объекты слоя хранятся в словаре по дескриптору: вставка и удаление O(1), порядок вставки сохраняется
+        self.layers: dict[str, dict[int, BaseGeoModel]] = {}
+        self.z_order: dict[str, int | float] = {}  # Слой -> z; слои рисуются по возрастанию
+        self.hidden_layers: set[str] = set()
+        self.static_layers: set[str] = set()
+        self.layer_cache: dict[str, pygame.Surface] = {}  # Растр статического слоя, пока его объекты не менялись
+        self.order: list[str] = []  # Имена слоёв, отсортированные по z
+        self.handles: dict[BaseGeoModel, tuple[str, int]] = {}  # Объект -> (слой, дескриптор)
+        self.next_handle = count()
+
+        # Учёт изменений для перерисовки только затронутых областей экрана
+        self.drawn: dict[BaseGeoModel, pygame.Rect] = {}  # Где объект нарисован в последнем кадре
+        self.changed: set[BaseGeoModel] = set()  # Объекты, изменённые после последнего кадра
+        self.dirty: list[pygame.Rect] = []  # Старые места изменённых объектов
+        self.full_redraw = True
+        self.max_dirty_rects = 32  # При большем числе областей дешевле перерисовать весь экран
+        self.max_dirty_share = 0.5  # То же при большей доле площади экрана
+
+        # Сетка клеток экрана для отсечения: кадр перебирает только объекты клеток, задевающих видимую область
+        self.cell_size = 128
+        self.max_cells = 64  # Объекты, занимающие больше клеток, проверяются в каждом кадре
+        self.grid: dict[str, dict[tuple[int, int], set[int]]] = {}  # Слой -> клетка -> дескрипторы
+        self.unbounded: dict[str, set[int]] = {}  # Слой -> объекты без прямоугольника или слишком крупные
+        self.boxes: dict[BaseGeoModel, pygame.Rect | None] = {}  # Текущий прямоугольник экрана объекта
+        self.spans: dict[BaseGeoModel, tuple[int, int, int, int] | None] = {}  # Занятые клетки, None - unbounded
+        self.stale: set[BaseGeoModel] = set()  # Объекты, которые нужно заново разложить по клеткам
+
+        # Статистика для профилировщика, накапливается до сброса в конце кадра
+        self.layer_times: dict[str, float] = {}  # Слой -> секунды отрисовки
+        self.drawn_count = 0  # Сколько объектов нарисовано
+
+        for name, z in LAYERS.items():
+            self.add_layer(name, z, static=name in STATIC_LAYERS)
+
+    def add_layer(self, name: str, z: int | float = 0, visible: bool = True, static: bool = False):
+        """
+        Добавляет слой или меняет параметры существующего
+        :param name: имя слоя
+        :param z: порядок отрисовки, слои с большим z рисуются поверх
+        :param visible: рисовать ли слой
+        :param static: растеризовать слой один раз в поверхность и копировать её, пока объекты слоя не меняются
+        """
+        self.layers.setdefault(name, {})
+        self.grid.setdefault(name, {})
+        self.unbounded.setdefault(name, set())
+        self.z_order[name] = z
+        self.order = sorted(self.z_order, key=self.z_order.get)
+        self.static_layers.discard(name)
+        if static:
+            self.static_layers.add(name)
+        self.layer_cache.pop(name, None)
+        self.set_layer_visible(name, visible)
 
-    def register(self, obj, layer: str = BACKGROUND):
+    def set_layer_visible(self, name: str, visible: bool):
+        if name not in self.layers:
+            raise ValueError(f"Layer '{name}' does not exist.")
+        if visible != (name not in self.hidden_layers):
+            self.hidden_layers.symmetric_difference_update({name})
+            self.invalidate_all()
+
+    def register(self, obj, layer: str = BACKGROUND) -> int:
+        """Добавляет объект в слой; возвращает его дескриптор"""
         if layer not in self.layers:
             raise ValueError(f"Layer '{layer}' does not exist.")
-        self.layers[layer].append(obj)
+        handle = next(self.next_handle)
+        self.layers[layer][handle] = obj
+        self.handles[obj] = (layer, handle)
+        self.layer_cache.pop(layer, None)
+        self.changed.add(obj)
+        self.stale.add(obj)
+        return handle
 
     def unregister(self, obj):
-        for layer in self.layers.keys():
-            if obj in self.layers[layer]:
-                self.layers[layer].remove(obj)
+        location = self.handles.pop(obj, None)
+        if location is None:
+            return
+        layer, handle = location
+        del self.layers[layer][handle]
+        self.unindex(obj, layer, handle)
+        self.layer_cache.pop(layer, None)
+        self.invalidate(obj)
+        self.changed.discard(obj)
+        self.stale.discard(obj)
+
+    def get(self, handle: int):
+        """Объект по дескриптору или None"""
+        for objects in self.layers.values():
+            if handle in objects:
+                return objects[handle]
+        return None
+
+    def visible_layers(self) -> list[dict]:
+        """Объекты видимых слоёв в порядке отрисовки"""
+        return [self.layers[name] for name in self.order if name not in self.hidden_layers]
 
     def clear_all(self):
-        self.layers = {BACKGROUND: [], MIDDLE: [], FOREGROUND: []}
+        """Удаляет все объекты; сами слои, их z-порядок и видимость сохраняются"""
+        for objects in self.layers.values():
+            objects.clear()
+        self.handles.clear()
+        self.layer_cache.clear()
+        for name in self.layers:
+            self.grid[name].clear()
+            self.unbounded[name].clear()
+        self.boxes.clear()
+        self.spans.clear()
+        self.stale.clear()
+        self.drawn.clear()
+        self.changed.clear()
+        self.dirty.clear()
+        self.full_redraw = True
+
+    def park(self) -> dict:
+        """Снимает все объекты с рендера, не удаляя их регистраций; вернуть их можно через resume()"""
+        self.reindex()
+        parked = {
+            'layers': self.layers, 'handles': self.handles, 'layer_cache': self.layer_cache,
+            'grid': self.grid, 'unbounded': self.unbounded, 'boxes': self.boxes, 'spans': self.spans
+        }
+        self.layers = {name: {} for name in parked['layers']}
+        self.grid = {name: {} for name in parked['layers']}
+        self.unbounded = {name: set() for name in parked['layers']}
+        self.handles, self.layer_cache, self.boxes, self.spans = {}, {}, {}, {}
+        self.clear_all()
+        return parked
+
+    def resume(self, parked: dict):
+        """Возвращает снятые park() объекты; текущие объекты рендера удаляются"""
+        self.clear_all()
+        for name in set(self.layers) - set(parked['layers']):
+            parked['layers'][name], parked['grid'][name], parked['unbounded'][name] = {}, {}, set()
+        for key, value in parked.items():
+            setattr(self, key, value)
+        # Объекты не менялись, пока были сняты: их места в сетке и кэши слоёв остались верными
+
+    @staticmethod
+    def footprint(parked: dict) -> int:
+        """Примерный объём снятых объектов в байтах: координаты и растры"""
+        surfaces = list(parked['layer_cache'].values())
+        total = 0
+        for obj in parked['handles']:
+            coors = getattr(obj, 'coors', None)
+            total += coors.nbytes if isinstance(coors, np.ndarray) else 0
+            if isinstance(getattr(obj, 'surface', None), pygame.Surface):
+                surfaces.append(obj.surface)
+        return total + sum(s.get_bytesize() * s.get_width() * s.get_height() for s in surfaces)
+
+    def invalidate(self, obj):
+        """Отмечает объект изменённым: его старое место и новое будут перерисованы"""
+        rect = self.drawn.pop(obj, None)
+        if rect is not None:
+            self.dirty.append(rect)
+        self.changed.add(obj)
+        self.stale.add(obj)
+        location = self.handles.get(obj)
+        if location is not None:
+            self.layer_cache.pop(location[0], None)
+
+    def invalidate_all(self):
+        """Следующий кадр будет нарисован целиком"""
+        self.full_redraw = True
+
+    def dirty_regions(self, screen_rect: pygame.Rect) -> list[pygame.Rect] | None:
+        """
+        Области экрана, которые нужно перерисовать в этом кадре
+        :returns: список прямоугольников (пустой, если ничего не менялось) или None, если перерисовать весь экран
+        """
+        if self.full_redraw:
+            return None
+
+        self.reindex()
+        rects = list(self.dirty)
+        for obj in self.changed:
+            if not obj.visible or obj not in self.handles:
+                continue
+            rect = self.boxes[obj]
+            if rect is None:
+                return None
+            rects.append(rect)
+
+        rects = [rect.clip(screen_rect) for rect in rects]
+        rects = [rect for rect in rects if rect.width and rect.height]
+        area = sum(rect.width * rect.height for rect in rects)
+        if len(rects) > self.max_dirty_rects or area > self.max_dirty_share * screen_rect.width * screen_rect.height:
+            return None
+        return rects
+
+    def frame_drawn(self):
+        """Запоминает, где теперь нарисованы объекты; вызывается после каждого кадра"""
+        self.reindex()
+        if self.full_redraw:
+            self.drawn.clear()
+            objects = [obj for objects in self.visible_layers() for obj in objects.values()]
+        else:
+            objects = self.changed
+        for obj in objects:
+            rect = self.boxes.get(obj) if obj.visible else None
+            if rect is not None:
+                self.drawn[obj] = rect
+        self.changed.clear()
+        self.dirty.clear()
+        self.full_redraw = False
+
+    def span(self, rect: pygame.Rect | None, limit: bool = True) -> tuple[int, int, int, int] | None:
+        """Диапазон клеток (x0, y0, x1, y1) включительно; None - прямоугольник неизвестен или больше max_cells"""
+        if rect is None:
+            return None
+        size = self.cell_size
+        x0, y0, x1, y1 = rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+        if limit and (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            return None
+        return x0, y0, x1, y1
+
+    @staticmethod
+    def span_cells(span: tuple[int, int, int, int]):
+        x0, y0, x1, y1 = span
+        return ((x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+
+    def unindex(self, obj, layer: str, handle: int):
+        """Убирает объект из клеток слоя"""
+        if obj not in self.spans:
+            return
+        span = self.spans.pop(obj)
+        self.boxes.pop(obj, None)
+        if span is None:
+            self.unbounded[layer].discard(handle)
+            return
+        cells = self.grid[layer]
+        for cell in self.span_cells(span):
+            bucket = cells[cell]
+            bucket.discard(handle)
+            if not bucket:
+                del cells[cell]
+
+    def reindex(self):
+        """Раскладывает изменённые объекты по клеткам их новых прямоугольников"""
+        for obj in self.stale:
+            location = self.handles.get(obj)
+            if location is None:
+                continue
+            rect = obj.bbox
+            span = self.span(rect)
+            # Обычно объект остаётся в тех же клетках, и достаточно обновить его прямоугольник
+            if obj in self.spans and self.spans[obj] == span:
+                self.boxes[obj] = rect
+                continue
+            layer, handle = location
+            self.unindex(obj, layer, handle)
+            self.boxes[obj] = rect
+            self.spans[obj] = span
+            if span is None:
+                self.unbounded[layer].add(handle)
+                continue
+            cells = self.grid[layer]
+            for cell in self.span_cells(span):
+                cells.setdefault(cell, set()).add(handle)
+        self.stale.clear()
+
+    def query(self, name: str, view: pygame.Rect):
+        """Объекты слоя, которые могут задевать view, в порядке отрисовки"""
+        objects = self.layers[name]
+        cells = self.grid[name]
+        x0, y0, x1, y1 = self.span(view, limit=False)
+        handles = set(self.unbounded[name])
+        if len(cells) < (x1 - x0 + 1) * (y1 - y0 + 1):
+            for (x, y), bucket in cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    handles.update(bucket)
+        else:
+            for cell in self.span_cells((x0, y0, x1, y1)):
+                handles.update(cells.get(cell, ()))
+        # Если видна большая часть слоя, обойти его целиком дешевле сортировки
+        if 2 * len(handles) > len(objects):
+            return objects.values()
+        return [objects[handle] for handle in sorted(handles)]
+
+    def render_all(self, surface, area: pygame.Rect | None = None):
+        self.reindex()
+        for name in self.order:
+            if name in self.hidden_layers:
+                continue
+            start = perf_counter()
+            if name in self.static_layers:
+                self.render_static(surface, name, area)
+            else:
+                self.render_layer(surface, name, area)
+            self.layer_times[name] = self.layer_times.get(name, 0.) + perf_counter() - start
+
+    def render_static(self, surface, name: str, area: pygame.Rect | None = None):
+        """Копирует кэшированный растр статического слоя, при необходимости растеризуя его заново"""
+        if not self.layers[name]:
+            return
+        cache = self.layer_cache.get(name)
+        if cache is None or cache.get_size() != surface.get_size():
+            # Прозрачность через цветовой ключ с RLE: пустые участки пропускаются целиком,
+            # копирование в разы быстрее попиксельной альфы и самой отрисовки слоя
+            objects = self.layers[name].values()
+            key = None
+            if all(obj.solid for obj in objects):
+                used = {tuple(obj.color) for obj in objects}
+                key = next((color for color in ((0, 0, i) for i in range(1, 256)) if color not in used), None)
+            if key is None:
+                # Пиксели растров и облаков точек могут совпасть с любым ключом, как и цвета, если заняты все:
+                # тогда прозрачность по альфе - медленнее, но ничего не пропадает
+                cache = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+                cache.fill((0, 0, 0, 0))
+                self.render_layer(cache, name)
+            else:
+                cache = pygame.Surface(surface.get_size(), 0, surface)
+                cache.fill(key)
+                self.render_layer(cache, name)
+                cache.set_colorkey(key, pygame.RLEACCEL)
+            self.layer_cache[name] = cache
+        if area is None:
+            surface.blit(cache, (0, 0))
+        else:
+            surface.blit(cache, area, area)
+
+    def render_layer(self, surface, name: str, area: pygame.Rect | None = None):
+        """Объекты слоя по порядку; рисуются только задевающие area или, без неё, поверхность"""
+        view = surface.get_rect() if area is None else area
+        batch = []  # Подряд идущие ломаные слоя, порядок наложения сохраняется
+        for obj in self.query(name, view):
+            if not obj.visible:
+                continue
+            # Объекты без известного места рисуются всегда
+            rect = self.boxes.get(obj)
+            if rect is not None and not rect.colliderect(view):
+                continue
+            self.drawn_count += 1
+            if obj.batched:
+                batch.append(obj)
+                continue
+            self.render_batch(surface, batch)
+            batch = []
+            obj.render(surface)
+        self.render_batch(surface, batch)
+
+    @staticmethod
+    def render_batch(surface, batch: list):
+        """
+        Ломаные пачкой: все вершины переводятся в экранные координаты одной операцией,
+        а ломаные одного цвета, продолжающие друг друга, рисуются одним вызовом
+        """
+        if not batch:
+            return
+        coors = [obj.coors for obj in batch]
+        # Дальше только списки Python: на коротких ломаных накладные расходы NumPy дороже самой работы
+        points = batch[0].get_new_coors_array(np.concatenate(coors)).tolist()
 
-    def render_all(self, surface):
-        for _, objects in self.layers.items():
-            for obj in objects:
-                if obj.visible:
-                    obj.render(surface)
+        chain, color, start = [], None, 0
+        for obj, obj_coors in zip(batch, coors):
+            obj_points = points[start:start + len(obj_coors)]
+            start += len(obj_coors)
+            if chain and obj.color == color and chain[-1] == obj_points[0]:
+                chain.extend(obj_points[1:])
+                continue
+            batch[0].draw_points(surface, chain, color)
+            chain, color = obj_points, obj.color
+        batch[0].draw_points(surface, chain, color)